@@ -5,8 +5,13 @@ from typing import TYPE_CHECKING, Optional
 from shared import (
     AbstractRabbitWorker,
     TaskMessage,
+    TaskEvent,
+    Job,
     JobsRedisClient,
+    TasksRedisClient,
     JobStage,
+    StatusEnum,
+    IdempotencyRedisClient,
 )
 from src.config import settings
 from src.llm import LLMHelper
@@ -18,10 +23,13 @@ logger = logging.getLogger(__name__)
 
 
 class LLMRabbitWorker(AbstractRabbitWorker):
+    stage = "llm"
+
     def __init__(
         self,
         llm_worker: LLMHelper,
         jobs_redis_cli: JobsRedisClient,
+        tasks_redis_cli: TasksRedisClient,
         producer_queue: str,
         host: str = "localhost",
         port: int = 5672,
@@ -30,45 +38,112 @@ class LLMRabbitWorker(AbstractRabbitWorker):
         max_retries: int = 3,
         dlx: str | None = None,
         last_resort_queue: str | None = None,
+        idempotency_redis_cli: IdempotencyRedisClient | None = None,
+        delay_queue: str | None = None,
     ):
         super().__init__(
-            host, port, login, password, max_retries, dlx, last_resort_queue
+            host,
+            port,
+            login,
+            password,
+            max_retries,
+            dlx,
+            last_resort_queue,
+            idempotency_redis_cli,
+            delay_queue=delay_queue,
         )
         self.producer_queue = producer_queue
         self.jobs_redis_cli = jobs_redis_cli
+        self.tasks_redis_cli = tasks_redis_cli
         self.llm = llm_worker
 
+    async def _get_input_text(self, task: TaskMessage) -> str | None:
+        """Take input text from inline payload or load it from Redis"""
+        if task.payload is not None:
+            return task.payload
+        job = await self.jobs_redis_cli.get_job_fields(task.id, ["input_text"])
+        return job.input_text if job else None
+
+    async def _save_markdown(self, task: TaskMessage, input_text: str, markdown: str):
+        """Store the result in the Job, which doesn't exist for inline input"""
+        if task.payload is not None:
+            await self.jobs_redis_cli.put_job(
+                Job(
+                    id=task.id,
+                    stage=JobStage.MARKDOWN,
+                    input_text=input_text,
+                    markdown=markdown,
+                    result_pdf_url="",
+                    error="",
+                )
+            )
+            return
+        if not await self.jobs_redis_cli.set_job_fields(
+            task.id, stage=JobStage.MARKDOWN, markdown=markdown
+        ):
+            raise ValueError(f"Task #{task.id} has no Job in Redis")
+
+    async def on_retries_exhausted(self, message: "AbstractIncomingMessage"):
+        task = TaskMessage.model_validate(json.loads(message.body.decode()))
+        await self.tasks_redis_cli.fail_task(task.id)
+
     async def process_message(self, message: "AbstractIncomingMessage"):
+        task = None
         try:
             # Deserialize message
             task = TaskMessage.model_validate(json.loads(message.body.decode()))
 
-            # Get data from Redis
-            job = await self.jobs_redis_cli.get_job(task.id)
-            job.stage = JobStage.MARKDOWN
+            # Skip duplicate deliveries before calling LLM
+            if not await self.claim_task(task.id, message):
+                return
+
+            # Get data from the message or from Redis
+            input_text = await self._get_input_text(task)
+            if input_text is None:
+                raise ValueError(f"Task #{task.id} has no Job in Redis")
             logger.debug(
-                f"Received task: Task #{id}. Processing text: {job.input_text[:50]}..."
+                f"Received task: Task #{task.id}. Processing text: {input_text[:50]}..."
             )
 
             # Make request to LLM
             # TODO: move to a separate function
             #  and raise 503 error if empty response
-            md_text = await self.llm.make_request(job.input_text)
+            md_text = await self.llm.make_request(input_text)
 
             if md_text:
-                # Save result to Redis and send to next worker
-                job.markdown = md_text
-                await self.jobs_redis_cli.put_job(job)
+                # Send small result inline, otherwise save it to Redis
+                if settings.rmq.fits_inline(md_text):
+                    next_task = TaskMessage(id=task.id, payload=md_text)
+                else:
+                    await self._save_markdown(task, input_text, md_text)
+                    next_task = TaskMessage(id=task.id)
                 # TODO: add to configs publisher_exchange
                 await self.publish_message(
                     exchange=settings.rmq.exchange,
                     routing_key=self.producer_queue,
-                    message=json.dumps(task.model_dump()).encode(),
+                    message=json.dumps(next_task.model_dump()).encode(),
                 )
+                # Best effort: the next stage is already enqueued
+                try:
+                    await self.tasks_redis_cli.publish_event(
+                        TaskEvent(
+                            id=task.id,
+                            status=StatusEnum.PROCESSING,
+                            stage=JobStage.MARKDOWN,
+                        )
+                    )
+                except Exception:
+                    logger.warning(
+                        f"Failed to publish event of task #{task.id}", exc_info=True
+                    )
                 logger.debug(f"Processed task: Task #{id}. Sent message to PDF-Worker.")
-                await message.ack()
+                await self.complete_task(task.id)
+                await self.ack(message)
                 return
-            await message.nack(requeue=False)
+            await self.release_task(task.id)
+            await self.nack(message)
         except Exception as e:
-            await message.nack(requeue=False)
+            await self.nack(message)
+            if task:
+                await self.release_task(task.id)
             logger.error(f"Failed to process task: {e}", exc_info=True)
@@ -2,7 +2,7 @@ from pathlib import Path
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from shared import RedisConfig, BrokerConfig
+from shared import RedisConfig, BrokerConfig, MetricsConfig, TracingConfig
 
 ENV_PATH = Path(__file__).resolve().parent.parent / ".env"
 
@@ -39,6 +39,8 @@ class Settings(BaseSettings):
     llm_prompt: PromptConfig = PromptConfig()
     redis: RedisConfig
     rmq: BrokerConfig
+    metrics: MetricsConfig = MetricsConfig()
+    tracing: TracingConfig = TracingConfig()
 
 
 settings = Settings()
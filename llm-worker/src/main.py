@@ -4,8 +4,12 @@ from src.llm import LLMHelper, PromptHelper
 from shared import (
     configure_logging,
     JobsRedisClient,
+    TasksRedisClient,
+    IdempotencyRedisClient,
     TopologyConfig,
     setup_rabbitmq_topology,
+    start_metrics_server,
+    configure_tracing,
 )
 from .broker import LLMRabbitWorker
 
@@ -18,6 +22,11 @@ async def main():
         queue_name=settings.rmq.consumer_queue,
         exchange_name=settings.rmq.exchange,
         dlx_name=settings.rmq.dlx,
+        queue_type=settings.rmq.queue_type,
+        delivery_limit=settings.rmq.delivery_limit,
+        max_length=settings.rmq.max_length,
+        overflow=settings.rmq.overflow,
+        legacy_queue=settings.rmq.legacy_consumer_queue,
     )
     await setup_rabbitmq_topology(
         topology_config,
@@ -26,6 +35,9 @@ async def main():
         login=settings.rmq.user,
         password=settings.rmq.password,
     )
+    configure_tracing(settings.tracing)
+    if settings.metrics.enabled:
+        start_metrics_server(settings.metrics.host, settings.metrics.port)
     llm = LLMHelper(
         api_key=settings.llm.yandex_cloud_api_key,
         base_url=settings.llm.base_url,
@@ -35,9 +47,14 @@ async def main():
         temperature=settings.llm.temperature,
     )
     redis = JobsRedisClient(settings.redis)
+    tasks_redis_cli = TasksRedisClient(settings.redis, redis.get_connection())
+    idempotency_redis_cli = IdempotencyRedisClient(
+        settings.redis, redis.get_connection()
+    )
     async with LLMRabbitWorker(
         llm_worker=llm,
         jobs_redis_cli=redis,
+        tasks_redis_cli=tasks_redis_cli,
         producer_queue=settings.rmq.producer_queue,
         host=settings.rmq.host,
         port=settings.rmq.port,
@@ -46,8 +63,12 @@ async def main():
         max_retries=3,
         dlx=settings.rmq.dlx,
         last_resort_queue=topology_config.last_resort_queue,
+        delay_queue=topology_config.delay_queue,
+        idempotency_redis_cli=idempotency_redis_cli,
     ) as broker:
-        await broker.start_consuming(settings.rmq.consumer_queue)
+        await broker.start_consuming(
+            settings.rmq.consumer_queue, settings.rmq.legacy_consumer_queue
+        )
 
 
 if __name__ == "__main__":
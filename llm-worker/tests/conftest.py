@@ -0,0 +1,11 @@
+import os
+
+# Settings are read from the environment when src modules are imported
+os.environ.setdefault("LLM__YANDEX_CLOUD_FOLDER", "folder")
+os.environ.setdefault("LLM__YANDEX_CLOUD_API_KEY", "key")
+os.environ.setdefault("LLM__YANDEX_CLOUD_MODEL", "model")
+os.environ.setdefault("LLM__BASE_URL", "http://localhost")
+os.environ.setdefault("RMQ__CONSUMER_QUEUE", "llm")
+os.environ.setdefault("RMQ__PRODUCER_QUEUE", "pdf")
+os.environ.setdefault("RMQ__DLX", "dlx")
+os.environ.setdefault("REDIS__HOST", "localhost")
@@ -0,0 +1,107 @@
+import json
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+
+import pytest
+
+from shared import JobStage, TaskMessage
+from src.broker import LLMRabbitWorker
+from src.config import settings
+
+
+@pytest.fixture
+def worker() -> LLMRabbitWorker:
+    worker = LLMRabbitWorker(
+        llm_worker=Mock(make_request=AsyncMock(return_value="# " + "x" * 100)),
+        jobs_redis_cli=AsyncMock(),
+        tasks_redis_cli=AsyncMock(),
+        producer_queue="pdf",
+    )
+    worker.claim_task = AsyncMock(return_value=True)
+    worker.complete_task = AsyncMock()
+    worker.release_task = AsyncMock()
+    worker.publish_message = AsyncMock()
+    worker.ack = AsyncMock()
+    worker.nack = AsyncMock()
+    return worker
+
+
+def make_message(task: TaskMessage) -> Mock:
+    return Mock(body=json.dumps(task.model_dump()).encode())
+
+
+@pytest.mark.asyncio
+async def test_large_result_of_inline_input_creates_job(worker, monkeypatch):
+    # Input fits inline, so task-api didn't create the Job, the result doesn't
+    monkeypatch.setattr(settings.rmq, "inline_payload_max_size", 50)
+    task = TaskMessage(id=str(uuid4()), payload="small input")
+
+    await worker.process_message(make_message(task))
+
+    job = worker.jobs_redis_cli.put_job.await_args.args[0]
+    assert str(job.id) == task.id
+    assert job.stage == JobStage.MARKDOWN
+    assert job.markdown == "# " + "x" * 100
+    worker.jobs_redis_cli.set_job_fields.assert_not_awaited()
+    sent = json.loads(worker.publish_message.await_args.kwargs["message"])
+    assert sent == {"id": task.id, "payload": None}
+    worker.ack.assert_awaited_once()
+    worker.nack.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_result_of_expired_job_is_retried(worker, monkeypatch):
+    monkeypatch.setattr(settings.rmq, "inline_payload_max_size", 50)
+    worker.jobs_redis_cli.get_job_fields.return_value = Mock(input_text="input")
+    worker.jobs_redis_cli.set_job_fields.return_value = False
+    task = TaskMessage(id=str(uuid4()))
+
+    await worker.process_message(make_message(task))
+
+    worker.jobs_redis_cli.put_job.assert_not_awaited()
+    worker.publish_message.assert_not_awaited()
+    worker.nack.assert_awaited_once()
+
+
+@pytest.fixture
+def delaying_worker() -> LLMRabbitWorker:
+    worker = LLMRabbitWorker(
+        llm_worker=Mock(),
+        jobs_redis_cli=AsyncMock(),
+        tasks_redis_cli=AsyncMock(),
+        producer_queue="pdf",
+        dlx="dlx",
+        delay_queue="llm.delay",
+    )
+    worker._channel = Mock(get_exchange=AsyncMock())
+    return worker
+
+
+@pytest.mark.asyncio
+async def test_requeue_later_publishes_to_delay_queue(delaying_worker):
+    message = Mock(body=b"{}", headers={"trace": "1"}, ack=AsyncMock())
+
+    await delaying_worker.requeue_later(message)
+
+    delaying_worker.channel.get_exchange.assert_awaited_once_with("dlx")
+    dlx = delaying_worker.channel.get_exchange.return_value
+    sent = dlx.publish.await_args.args[0]
+    assert sent.body == b"{}"
+    assert sent.headers["trace"] == "1"
+    assert sent.expiration == delaying_worker.requeue_delay
+    assert dlx.publish.await_args.kwargs["routing_key"] == "llm.delay"
+    message.ack.assert_awaited_once()
+
+
+def test_delayed_redelivery_is_not_counted_as_retry(delaying_worker):
+    message = Mock(
+        headers={
+            "x-death": [
+                {"queue": "llm.delay", "reason": "expired", "count": 4},
+                {"queue": "llm.dlq", "reason": "expired", "count": 1},
+                {"queue": "llm", "reason": "rejected", "count": 1},
+            ]
+        }
+    )
+
+    assert delaying_worker.get_message_deaths_count(message) == 1
@@ -6,9 +6,12 @@ from typing import TYPE_CHECKING
 from shared import (
     AbstractRabbitWorker,
     TaskMessage,
+    TaskEvent,
+    JobStage,
     TasksRedisClient,
     JobsRedisClient,
     StatusEnum,
+    IdempotencyRedisClient,
 )
 from src.s3.utils import FileUploadService
 
@@ -23,6 +26,8 @@ logger = logging.getLogger(__name__)
 
 
 class RabbitWorker(AbstractRabbitWorker):
+    stage = "pdf"
+
     def __init__(
         self,
         tasks_redis_cli: TasksRedisClient,
@@ -35,18 +40,33 @@ class RabbitWorker(AbstractRabbitWorker):
         max_retries: int = 3,
         dlx: str | None = None,
         last_resort_queue: str | None = None,
+        idempotency_redis_cli: IdempotencyRedisClient | None = None,
+        delay_queue: str | None = None,
     ):
         super().__init__(
-            host, port, login, password, max_retries, dlx, last_resort_queue
+            host,
+            port,
+            login,
+            password,
+            max_retries,
+            dlx,
+            last_resort_queue,
+            idempotency_redis_cli,
+            delay_queue=delay_queue,
         )
         self.tasks_redis_cli = tasks_redis_cli
         self.job_redis_cli = job_redis_cli
         self.md_worker = md_worker
 
+    async def on_retries_exhausted(self, message: "AbstractIncomingMessage"):
+        task = TaskMessage.model_validate(json.loads(message.body.decode()))
+        await self.tasks_redis_cli.fail_task(task.id)
+
     async def process_message(self, message: "AbstractIncomingMessage"):
+        task_msg = None
         try:
             if random() > 0.2:
-                await message.nack(requeue=False)
+                await self.nack(message)
                 logger.debug("Failed to process message. Sending to DLQ")
                 return
             # deserialize message
@@ -54,33 +74,61 @@ class RabbitWorker(AbstractRabbitWorker):
                 json.loads(message.body.decode(encoding="utf-8"))
             )
 
-            # get data from redis
-            job = await self.job_redis_cli.get_job(task_msg.id)
+            # Skip duplicate deliveries before rendering PDF
+            if not await self.claim_task(task_msg.id, message):
+                return
+
+            # get data from redis, markdown may come inline in the message
+            job = None
+            if task_msg.payload is None:
+                job = await self.job_redis_cli.get_job_fields(task_msg.id, ["markdown"])
             task = await self.tasks_redis_cli.get_task(task_msg.id)
 
             # Ignore request if data in Redis not exists
-            if not (task and job):
+            if not (task and (job or task_msg.payload is not None)):
                 logger.warning(
                     f"Task #{task_msg.id} has no Job or Task in Redis. Skipping."
                 )
+                await self.release_task(task_msg.id)
                 return
             logger.debug(f"Received task #{task.id}")
 
             # convert file and save
-            pdf_bytes = await self.md_worker.convert_file_to_pdf(job.markdown)
+            markdown = job.markdown if job else task_msg.payload
+            pdf_bytes = await self.md_worker.convert_file_to_pdf(markdown)
             # upload file to S3
             link = await FileUploadService.upload_file(pdf_bytes, str(task_msg.id))
             # update task and job status
             task.pdf_url = link
             task.status = StatusEnum.READY
-            job.result_pdf_url = task.pdf_url
             await self.tasks_redis_cli.create_task(task)
-            await self.job_redis_cli.put_job(job)
-            logger.debug(f"Processed task: Task #{task.id}")
-            await message.ack()
+            # Best effort: a failed event must not redo the rendering
+            try:
+                await self.tasks_redis_cli.publish_event(
+                    TaskEvent(
+                        id=task.id, status=task.status, stage=JobStage.PDF, pdf_url=link
+                    )
+                )
+            except Exception:
+                logger.warning(
+                    f"Failed to publish event of task #{task.id}", exc_info=True
+                )
+            if job:
+                await self.job_redis_cli.set_job_fields(
+                    task_msg.id, result_pdf_url=task.pdf_url
+                )
+            # Don't forward the inline markdown to the tasks consumer.
+            # Publish before ack, so a failed publish leaves the message for retry
             await self.publish_message(
-                settings.rmq.producer_queue, settings.rmq.exchange, message.body
+                settings.rmq.producer_queue,
+                settings.rmq.exchange,
+                json.dumps(TaskMessage(id=task_msg.id).model_dump()).encode(),
             )
+            logger.debug(f"Processed task: Task #{task.id}")
+            await self.complete_task(task_msg.id)
+            await self.ack(message)
         except Exception as e:
-            await message.nack(requeue=False)
+            await self.nack(message)
+            if task_msg:
+                await self.release_task(task_msg.id)
             logger.exception(f"Error processing message")
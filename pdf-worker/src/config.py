@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from shared import RedisConfig, BrokerConfig
+from shared import RedisConfig, BrokerConfig, MetricsConfig, TracingConfig
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     md: MarkdownConfig = MarkdownConfig()
     redis: RedisConfig
     aws: AwsConfig
+    metrics: MetricsConfig = MetricsConfig()
+    tracing: TracingConfig = TracingConfig()
 
 
 settings = Settings()
@@ -1,11 +1,14 @@
 import asyncio
-from redis.asyncio import Redis
 from shared import (
     configure_logging,
     JobsRedisClient,
     TasksRedisClient,
+    IdempotencyRedisClient,
     TopologyConfig,
     setup_rabbitmq_topology,
+    start_metrics_server,
+    configure_tracing,
+    TimedRedis,
 )
 from src.config import settings
 
@@ -21,6 +24,11 @@ if __name__ == "__main__":
             queue_name=settings.rmq.consumer_queue,
             exchange_name=settings.rmq.exchange,
             dlx_name=settings.rmq.dlx,
+            queue_type=settings.rmq.queue_type,
+            delivery_limit=settings.rmq.delivery_limit,
+            max_length=settings.rmq.max_length,
+            overflow=settings.rmq.overflow,
+            legacy_queue=settings.rmq.legacy_consumer_queue,
         )
         await setup_rabbitmq_topology(
             topology_config,
@@ -30,8 +38,12 @@ if __name__ == "__main__":
             password=settings.rmq.password,
         )
 
+        configure_tracing(settings.tracing)
+        if settings.metrics.enabled:
+            start_metrics_server(settings.metrics.host, settings.metrics.port)
+
         # Create redis instance
-        redis = Redis(
+        redis = TimedRedis(
             host=settings.redis.host,
             port=settings.redis.port,
             db=settings.redis.db,
@@ -41,6 +53,7 @@ if __name__ == "__main__":
         # Create redis clients
         jobs_redis_cli = JobsRedisClient(settings.redis, redis)
         tasks_redis_cli = TasksRedisClient(settings.redis, redis)
+        idempotency_redis_cli = IdempotencyRedisClient(settings.redis, redis)
 
         # Create PDF worker and rabbit worker
         pdf_worker = PdfConverter()
@@ -55,8 +68,12 @@ if __name__ == "__main__":
             max_retries=3,
             dlx=settings.rmq.dlx,
             last_resort_queue=topology_config.last_resort_queue,
+            delay_queue=topology_config.delay_queue,
+            idempotency_redis_cli=idempotency_redis_cli,
         ) as rabbit:
             # Start consuming messages
-            await rabbit.start_consuming(settings.rmq.consumer_queue)
+            await rabbit.start_consuming(
+                settings.rmq.consumer_queue, settings.rmq.legacy_consumer_queue
+            )
 
     asyncio.run(main())
@@ -5,10 +5,14 @@ from aiobotocore.session import get_session
 from botocore.exceptions import ClientError
 
 from src.config import settings
-from shared import AwsError
+from shared import AwsError, Histogram
 
 logger = logging.getLogger(__name__)
 
+S3_REQUEST_SECONDS = Histogram(
+    "s3_request_seconds", "Duration of S3 requests", ["operation"]
+)
+
 
 class S3Client:
     def __init__(
@@ -40,9 +44,10 @@ class S3Client:
         file_path = f"{self.folder}/{filename}" if self.folder else filename
         try:
             async with self.get_client() as client:
-                await client.put_object(
-                    Bucket=self.bucket_name, Key=file_path, Body=data
-                )
+                with S3_REQUEST_SECONDS.labels(operation="put_object").time():
+                    await client.put_object(
+                        Bucket=self.bucket_name, Key=file_path, Body=data
+                    )
                 return f"{self.domain}/{file_path}"
         except ClientError as e:
             raise AwsError("Upload file error") from e
@@ -51,7 +56,8 @@ class S3Client:
         file_path = f"{self.folder}/{filename}" if self.folder else filename
         try:
             async with self.get_client() as client:
-                await client.delete_object(Bucket=self.bucket_name, Key=file_path)
+                with S3_REQUEST_SECONDS.labels(operation="delete_object").time():
+                    await client.delete_object(Bucket=self.bucket_name, Key=file_path)
         except ClientError as e:
             logger.error(f"Error deleting file {file_path}", exc_info=e)
             raise AwsError("Delete file error") from e
@@ -0,0 +1,73 @@
+"""
+Memory per Job hash in Redis with and without compression.
+
+Usage (Redis must be running):
+    python -m benchmarks.jobs_memory --host localhost --jobs 200 --size 65536
+"""
+
+import argparse
+import asyncio
+import random
+from uuid import uuid4
+
+from shared import Job, JobStage, JobsRedisClient, RedisConfig
+
+WORDS = (
+    "markdown document section table list code block paragraph heading "
+    "text canvas render pdf style report summary value item"
+).split()
+
+
+def make_text(size: int) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = random.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+async def measure(config: RedisConfig, jobs: int, size: int) -> float:
+    client = JobsRedisClient(config)
+    redis = client.get_connection()
+    ids = [uuid4() for _ in range(jobs)]
+    try:
+        for id in ids:
+            await client.put_job(
+                Job(
+                    id=id,
+                    stage=JobStage.MARKDOWN,
+                    input_text=make_text(size),
+                    markdown=make_text(size),
+                    result_pdf_url="",
+                    error="",
+                )
+            )
+        usage = [await redis.memory_usage(f"job:{id}") for id in ids]
+        return sum(usage) / len(usage)
+    finally:
+        await redis.delete(*(f"job:{id}" for id in ids))
+        await client.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    base = RedisConfig(host=args.host, port=args.port)
+    plain = await measure(base, args.jobs, args.size)
+    compressed = await measure(
+        base.model_copy(update={"jobs_compression": True}), args.jobs, args.size
+    )
+    print(f"jobs={args.jobs} field_size={args.size} bytes")
+    print(f"plain:      {plain / 1024:10.1f} KiB/job")
+    print(f"compressed: {compressed / 1024:10.1f} KiB/job ({plain / compressed:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
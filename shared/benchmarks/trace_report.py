@@ -0,0 +1,70 @@
+"""
+End-to-end latency of tasks by stage from exported spans.
+
+Enable export in every service (TRACING__ENABLED=true, TRACING__FILE_PATH=...),
+concatenate the files and run:
+    python -m benchmarks.trace_report traces.jsonl
+"""
+
+import argparse
+from collections import defaultdict
+from statistics import quantiles
+
+from shared.tracing import load_spans
+
+
+def percentiles(values: list[float]) -> tuple[float, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value
+    cuts = quantiles(values, n=100)
+    return cuts[49], cuts[94]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    spans = [span for path in args.files for span in load_spans(path)]
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span.trace_id].append(span)
+
+    waits = defaultdict(list)
+    retry_waits = defaultdict(list)
+    work = defaultdict(list)
+    for span in spans:
+        work[span.name].append(span.duration)
+        if span.queue_wait is not None:
+            waits[span.name].append(span.queue_wait)
+        if span.retry_wait is not None:
+            retry_waits[span.name].append(span.retry_wait)
+
+    print(f"traces={len(traces)} spans={len(spans)}")
+    print(
+        f"{'stage':<16}{'count':>7}{'wait p50':>10}{'wait p95':>10}"
+        f"{'work p50':>10}{'work p95':>10}{'retries':>9}{'retry p95':>11}"
+    )
+    for name in sorted(
+        work, key=lambda name: min(s.start for s in spans if s.name == name)
+    ):
+        wait_p50, wait_p95 = percentiles(waits[name])
+        work_p50, work_p95 = percentiles(work[name])
+        _, retry_p95 = percentiles(retry_waits[name])
+        print(
+            f"{name:<16}{len(work[name]):>7}{wait_p50:>10.3f}{wait_p95:>10.3f}"
+            f"{work_p50:>10.3f}{work_p95:>10.3f}"
+            f"{len(retry_waits[name]):>9}{retry_p95:>11.3f}"
+        )
+
+    total = [
+        max(s.end for s in trace) - min(s.start for s in trace)
+        for trace in traces.values()
+    ]
+    total_p50, total_p95 = percentiles(total)
+    print(f"end-to-end p50={total_p50:.3f}s p95={total_p95:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
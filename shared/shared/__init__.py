@@ -1,10 +1,45 @@
 from .exceptions import RabbitError, AppError, AwsError
 from .async_rmq import AbstractRabbitConsumer, AbstractRabbitWorker, RabbitPublisher
-from .config import configure_logging, BrokerConfig, RedisConfig, TopologyConfig
-from .redis import RedisClient, JobsRedisClient, TasksRedisClient
-from .db.unit_of_work import UnitOfWork
-from .broker_messages import TaskMessage, Job, JobStage, TaskSchema, StatusEnum
+from .config import (
+    configure_logging,
+    BrokerConfig,
+    RedisConfig,
+    TopologyConfig,
+    QueueType,
+    QueueOverflow,
+    MetricsConfig,
+    TracingConfig,
+)
+from .redis import (
+    RedisClient,
+    TimedRedis,
+    JobsRedisClient,
+    TasksRedisClient,
+    IdempotencyRedisClient,
+    TaskListCacheRedisClient,
+)
+from .db.unit_of_work import UnitOfWork, ReadOnlyUnitOfWork
+from .broker_messages import (
+    TaskMessage,
+    Job,
+    JobFields,
+    JobStage,
+    TaskEvent,
+    TaskSchema,
+    StatusEnum,
+)
 from .rmq_topology import setup_rabbitmq_topology
+from .timing import RequestTiming, start_timing, get_timing, timing_span
+from .metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    start_metrics_server,
+    render_metrics,
+    prepare_multiprocess_dir,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+)
+from .tracing import tracer, configure_tracing
 
 __all__ = [
     "AppError",
@@ -16,15 +51,38 @@ __all__ = [
     "RabbitPublisher",
     "RedisClient",
     "UnitOfWork",
+    "ReadOnlyUnitOfWork",
     "TaskMessage",
     "JobsRedisClient",
     "TasksRedisClient",
+    "IdempotencyRedisClient",
+    "TaskListCacheRedisClient",
     "Job",
+    "JobFields",
     "JobStage",
     "BrokerConfig",
     "TaskSchema",
+    "TaskEvent",
     "StatusEnum",
     "setup_rabbitmq_topology",
     "TopologyConfig",
     "AwsError",
+    "QueueType",
+    "QueueOverflow",
+    "RequestTiming",
+    "start_timing",
+    "get_timing",
+    "timing_span",
+    "TimedRedis",
+    "MetricsConfig",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "start_metrics_server",
+    "render_metrics",
+    "prepare_multiprocess_dir",
+    "METRICS_CONTENT_TYPE",
+    "TracingConfig",
+    "tracer",
+    "configure_tracing",
 ]
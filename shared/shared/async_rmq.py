@@ -1,14 +1,20 @@
 import asyncio
 import logging
+import time
 import aio_pika
 
 from typing import TYPE_CHECKING
 from abc import ABC, abstractmethod
 
 from .exceptions import RabbitError
+from .metrics import MESSAGES, MESSAGES_IN_FLIGHT, MESSAGE_PROCESSING_SECONDS
+from .timing import timing_span
+from .tracing import PUBLISHED_AT_HEADER, tracer
 
 if TYPE_CHECKING:
+    from uuid import UUID
     from aio_pika.abc import AbstractIncomingMessage, AbstractRobustChannel
+    from .redis import IdempotencyRedisClient
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +33,7 @@ class RabbitHelper:
         self.login = login
         self.password = password
         self._channel: "AbstractRobustChannel" = None
+        self._stats_channel: "AbstractRobustChannel | None" = None
 
     async def __aenter__(
         self,
@@ -46,7 +53,21 @@ class RabbitHelper:
             raise RabbitError("Please call RabbitHelper from context manager")
         return self._channel
 
+    async def queue_stats(self, queue_name: str) -> tuple[int, int]:
+        """Number of ready messages and consumers of the queue"""
+        # Passive declare of a missing queue closes the channel, so it is
+        # done on a separate one
+        if self._stats_channel is None or self._stats_channel.is_closed:
+            self._stats_channel = await self._connection.channel()
+        queue = await self._stats_channel.declare_queue(
+            queue_name, passive=True, robust=False
+        )
+        result = queue.declaration_result
+        return result.message_count, result.consumer_count
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._stats_channel and not self._stats_channel.is_closed:
+            await self._stats_channel.close()
         if self._channel and not self._channel.is_closed:
             await self._channel.close()
         if not self._connection.is_closed:
@@ -56,11 +77,43 @@ class RabbitHelper:
 class RabbitPublisher(RabbitHelper):
     async def publish_message(self, routing_key: str, exchange: str, message: bytes):
         exchange = await self._channel.get_exchange(exchange)
-        logger.debug(f"Sending message {message} to #{routing_key} queue")
-        await exchange.publish(aio_pika.Message(message), routing_key=routing_key)
+        # Message may carry an inline payload, so don't log the body
+        logger.debug(f"Sending message ({len(message)} bytes) to #{routing_key} queue")
+        with timing_span("broker"):
+            await exchange.publish(
+                aio_pika.Message(message, headers=tracer.inject()),
+                routing_key=routing_key,
+            )
+
+    async def publish_messages(
+        self, routing_key: str, exchange: str, messages: list[bytes]
+    ) -> list[BaseException | None]:
+        """
+        Publish messages without waiting for each confirm in turn.
+        Returns an exception for every message that was not confirmed, None otherwise.
+        """
+        exchange = await self._channel.get_exchange(exchange)
+        logger.debug(f"Sending {len(messages)} messages to #{routing_key} queue")
+        with timing_span("broker"):
+            results = await asyncio.gather(
+                *(
+                    exchange.publish(
+                        aio_pika.Message(message, headers=tracer.inject()),
+                        routing_key=routing_key,
+                    )
+                    for message in messages
+                ),
+                return_exceptions=True,
+            )
+        return [
+            result if isinstance(result, BaseException) else None for result in results
+        ]
 
 
 class AbstractRabbitConsumer(RabbitHelper, ABC):
+    # Name of the processing stage used as idempotency key prefix
+    stage: str = "default"
+
     def __init__(
         self,
         host: str = "localhost",
@@ -70,11 +123,19 @@ class AbstractRabbitConsumer(RabbitHelper, ABC):
         max_retries: int = 3,
         dlx: str | None = None,
         last_resort_queue: str | None = None,
+        idempotency_redis_cli: "IdempotencyRedisClient | None" = None,
+        requeue_delay: float = 5,
+        delay_queue: str | None = None,
     ):
         super().__init__(host, port, login, password)
         self.max_retries = max_retries
         self.dlx = dlx
         self.last_resort_queue = last_resort_queue
+        self.idempotency_redis_cli = idempotency_redis_cli
+        # Delay before a duplicate of a task in progress is seen again, it
+        # waits in the delay queue (bound to the DLX) meanwhile
+        self.requeue_delay = requeue_delay
+        self.delay_queue = delay_queue
 
     @abstractmethod
     async def process_message(
@@ -82,15 +143,97 @@ class AbstractRabbitConsumer(RabbitHelper, ABC):
         message: "AbstractIncomingMessage",
     ): ...
 
-    @staticmethod
-    def get_message_deaths_count(message: "AbstractIncomingMessage") -> int:
+    async def on_retries_exhausted(self, message: "AbstractIncomingMessage"):
+        """Called when the message goes to the last resort queue, e.g. to
+        mark the task as failed"""
+
+    def get_message_deaths_count(self, message: "AbstractIncomingMessage") -> int:
         x_death_headers = message.headers.get("x-death")
         if x_death_headers:
             for props in x_death_headers:
-                if isinstance(props, dict) and "count" in props:
-                    return int(props["count"])
+                if not isinstance(props, dict) or "count" not in props:
+                    continue
+                # Expired in the delay queue, not a failed attempt
+                if self.delay_queue and props.get("queue") == self.delay_queue:
+                    continue
+                return int(props["count"])
         return 0
 
+    async def ack(self, message: "AbstractIncomingMessage"):
+        await message.ack()
+        MESSAGES.labels(stage=self.stage, outcome="ack").inc()
+
+    async def nack(self, message: "AbstractIncomingMessage"):
+        """Reject the message without requeue, so it goes to DLQ"""
+        await message.nack(requeue=False)
+        MESSAGES.labels(stage=self.stage, outcome="dlq").inc()
+
+    async def claim_task(
+        self,
+        task_id: "UUID | str",
+        message: "AbstractIncomingMessage",
+    ) -> bool:
+        """
+        Claim the task before doing any expensive work.
+
+        A duplicate of a completed task is acked and dropped. A task claimed
+        by another worker is published again after a delay: the claimant may
+        have crashed and this may be its redelivered message. Sending it to
+        DLQ instead would count as a retry of a healthy task.
+        """
+        if self.idempotency_redis_cli is None:
+            return True
+        if await self.idempotency_redis_cli.claim(self.stage, task_id):
+            return True
+
+        if await self.idempotency_redis_cli.is_completed(self.stage, task_id):
+            logger.info(f"Task #{task_id} already processed at {self.stage}. Skipping.")
+            await self.ack(message)
+        else:
+            logger.info(f"Task #{task_id} is being processed by another worker.")
+            await self.requeue_later(message)
+        return False
+
+    async def requeue_later(self, message: "AbstractIncomingMessage"):
+        """
+        Redeliver the message after a delay, not counted as retry.
+
+        A copy waits in the delay queue until its TTL expires and is
+        dead-lettered back to the main queue, so the consumer takes the next
+        message meanwhile. Without a delay queue the message goes to DLQ.
+        """
+        if not (self.dlx and self.delay_queue):
+            await self.nack(message)
+            return
+        dlx = await self.channel.get_exchange(self.dlx)
+        # Trace and x-death headers are kept, queue wait starts after the delay
+        headers = {
+            **message.headers,
+            PUBLISHED_AT_HEADER: time.time() + self.requeue_delay,
+        }
+        await dlx.publish(
+            aio_pika.Message(
+                message.body, headers=headers, expiration=self.requeue_delay
+            ),
+            routing_key=self.delay_queue,
+        )
+        await message.ack()
+        MESSAGES.labels(stage=self.stage, outcome="requeue").inc()
+
+    async def complete_task(self, task_id: "UUID | str"):
+        if self.idempotency_redis_cli is not None:
+            await self.idempotency_redis_cli.complete(self.stage, task_id)
+
+    async def release_task(self, task_id: "UUID | str"):
+        """Drop the claim, so a redelivery can process the task (best effort)"""
+        if self.idempotency_redis_cli is None:
+            return
+        try:
+            await self.idempotency_redis_cli.release(self.stage, task_id)
+        except Exception:
+            # The claim expires by itself
+            logger.warning(f"Failed to release task #{task_id}", exc_info=True)
+
     async def check_and_process_message(
         self,
         message: "AbstractIncomingMessage",
@@ -105,16 +248,35 @@ class AbstractRabbitConsumer(RabbitHelper, ABC):
             if self.dlx and self.last_resort_queue:
                 dlx = await self.channel.get_exchange(self.dlx)
                 await dlx.publish(message, routing_key=self.last_resort_queue)
+            try:
+                await self.on_retries_exhausted(message)
+            except Exception:
+                logger.warning("Failed to handle exhausted retries", exc_info=True)
             await message.ack()
+            MESSAGES.labels(stage=self.stage, outcome="last_resort").inc()
             return None
-        return await self.process_message(message)
+        with (
+            tracer.consume(self.stage, message.headers, retries=deaths_count),
+            MESSAGES_IN_FLIGHT.labels(stage=self.stage).track_inprogress(),
+            MESSAGE_PROCESSING_SECONDS.labels(stage=self.stage).time(),
+        ):
+            return await self.process_message(message)
+
+    async def start_consuming(self, queue_name: str, *extra_queues: str | None):
+        """
+        Consume messages from the queue.
 
-    async def start_consuming(self, queue_name: str):
+        Extra queues (e.g. an old classic queue left after switching the
+        queue type) are consumed with the same handler until they are drained.
+        """
         await self.channel.set_qos(prefetch_count=1)
-        queue = await self.channel.get_queue(queue_name)
 
-        # Start listening the queue
-        await queue.consume(self.check_and_process_message)
+        for name in (queue_name, *extra_queues):
+            if not name:
+                continue
+            queue = await self.channel.get_queue(name)
+            # Start listening the queue
+            await queue.consume(self.check_and_process_message)
 
         await asyncio.Future()
 
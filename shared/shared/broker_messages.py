@@ -6,6 +6,9 @@ from pydantic import BaseModel
 
 class TaskMessage(BaseModel):
     id: str
+    # Input of the next stage, carried inline for small documents.
+    # If None, the input is read from the Job in Redis (claim-check).
+    payload: str | None = None
 
 
 class StatusEnum(str, Enum):
@@ -28,6 +31,15 @@ class JobStage(str, Enum):
     ERROR = "error"
 
 
+class TaskEvent(BaseModel):
+    """Task stage transition published to Redis pub/sub"""
+
+    id: UUID
+    status: StatusEnum
+    stage: JobStage | None = None
+    pdf_url: str | None = None
+
+
 class Job(BaseModel):
     id: UUID
     stage: JobStage
@@ -35,3 +47,14 @@ class Job(BaseModel):
     markdown: str
     result_pdf_url: str
     error: str
+
+
+class JobFields(BaseModel):
+    """Subset of Job fields loaded from Redis"""
+
+    id: UUID
+    stage: JobStage | None = None
+    input_text: str | None = None
+    markdown: str | None = None
+    result_pdf_url: str | None = None
+    error: str | None = None
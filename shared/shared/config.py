@@ -1,7 +1,8 @@
 import logging
+from enum import Enum
 
 import pika
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 
 def configure_logging(level: int = logging.DEBUG):
@@ -17,6 +18,38 @@ def configure_logging(level: int = logging.DEBUG):
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("asyncio").setLevel(logging.WARNING)
 
+
+class QueueType(str, Enum):
+    """Value of the `x-queue-type` queue argument.
+
+    Streams are not supported: they are non-destructive, acked messages stay
+    in the stream and every consumer reads them again.
+    """
+
+    CLASSIC = "classic"
+    QUORUM = "quorum"
+
+
+class QueueOverflow(str, Enum):
+    """Value of the `x-overflow` queue argument"""
+
+    DROP_HEAD = "drop-head"
+    REJECT_PUBLISH = "reject-publish"
+    REJECT_PUBLISH_DLX = "reject-publish-dlx"
+
+
+def validate_queue_arguments(
+    queue_type: QueueType,
+    delivery_limit: int | None,
+    overflow: QueueOverflow | None,
+):
+    """Reject queue arguments RabbitMQ refuses at declare time"""
+    if queue_type == QueueType.QUORUM and overflow == QueueOverflow.REJECT_PUBLISH_DLX:
+        raise ValueError("Quorum queues don't support reject-publish-dlx overflow")
+    if delivery_limit is not None and queue_type != QueueType.QUORUM:
+        raise ValueError("delivery_limit is only supported by quorum queues")
+
+
 class TopologyConfig(BaseModel):
     """RabbitMQ topology configuration"""
 
@@ -26,6 +59,32 @@ class TopologyConfig(BaseModel):
     dlq_name: str
     dlq_timeout: int
     last_resort_queue: str
+    # Queue without consumers where messages wait for their per-message TTL,
+    # then go back to the main queue (delayed redelivery, not a retry)
+    delay_queue: str | None = None
+    queue_type: QueueType = QueueType.CLASSIC
+    delivery_limit: int | None = None
+    max_length: int | None = None
+    overflow: QueueOverflow | None = None
+    # Classic queue that is still declared (and drained) while migrating
+    # to a queue of another type. Queue type can't be changed in place.
+    legacy_queue: str | None = None
+
+    @model_validator(mode="after")
+    def check_queue_arguments(self) -> "TopologyConfig":
+        validate_queue_arguments(self.queue_type, self.delivery_limit, self.overflow)
+        return self
+
+    def get_legacy_topology(self) -> "TopologyConfig | None":
+        """Classic topology of the queue we are migrating from, if any"""
+        if not self.legacy_queue:
+            return None
+        return TopologyConfig.from_queue_name(
+            queue_name=self.legacy_queue,
+            exchange_name=self.main_exchange,
+            dlx_name=self.dlx_name,
+            dlq_timeout=self.dlq_timeout,
+        )
 
     @classmethod
     def from_queue_name(
@@ -34,6 +93,11 @@ class TopologyConfig(BaseModel):
         exchange_name: str,
         dlx_name: str,
         dlq_timeout: int = 60000,  # 60 seconds
+        queue_type: QueueType = QueueType.CLASSIC,
+        delivery_limit: int | None = None,
+        max_length: int | None = None,
+        overflow: QueueOverflow | None = None,
+        legacy_queue: str | None = None,
     ) -> "TopologyConfig":
         """
         Create topology config from queue name with automatic DLQ naming.
@@ -43,9 +107,16 @@ class TopologyConfig(BaseModel):
             exchange_name: Name of the main exchange
             dlx_name: Name of the dead letter exchange
             dlq_timeout: Timeout in milliseconds before retry from DLQ
+            queue_type: Type of the main queue (classic or quorum)
+            delivery_limit: Max redeliveries before dead-lettering (quorum only)
+            max_length: Max number of ready messages in the main queue
+            overflow: Behaviour of the main queue when max_length is reached
+            legacy_queue: Name of the old classic queue to keep declared
+                while its messages are drained
 
         Returns:
-            TopologyConfig with auto-generated DLQ and last resort queue names
+            TopologyConfig with auto-generated DLQ, last resort and delay
+            queue names
         """
         return cls(
             main_exchange=exchange_name,
@@ -54,15 +125,54 @@ class TopologyConfig(BaseModel):
             dlq_name=f"{queue_name}.dlq",
             dlq_timeout=dlq_timeout,
             last_resort_queue=f"{queue_name}.last_resort",
+            delay_queue=f"{queue_name}.delay",
+            queue_type=queue_type,
+            delivery_limit=delivery_limit,
+            max_length=max_length,
+            overflow=overflow,
+            legacy_queue=legacy_queue,
         )
 
 
+class MetricsConfig(BaseModel):
+    """Scrape endpoint of a worker process"""
+
+    enabled: bool = True
+    host: str = "0.0.0.0"
+    port: int = 9100
+
+
+class TracingConfig(BaseModel):
+    """Export of spans of message processing"""
+
+    enabled: bool = False
+    # JSON lines file with spans (see benchmarks/trace_report.py)
+    file_path: str = "traces.jsonl"
+    # Spans are written by a background thread once per interval (seconds)
+    flush_interval: float = 1.0
+
+
 class RedisConfig(BaseModel):
     host: str = "localhost"
     port: int = 6379
     db: int = 0
     tasks_ttl: int = 3600
     jobs_ttl: int = 900
+    # Lifetime of finished tasks copied back from DB to Redis
+    tasks_writeback_ttl: int = 600
+    # Lifetime of "task not found" markers
+    tasks_missing_ttl: int = 30
+    # Lifetime of cached first pages of users' task lists
+    task_list_ttl: int = 300
+    # Store large Job text fields zlib-compressed
+    jobs_compression: bool = False
+    # Fields smaller than this (bytes) are stored as plain text
+    jobs_compression_threshold: int = 1024
+    jobs_compression_level: int = 6
+    # Lifetime of a processing claim. Expires if the worker crashes
+    idempotency_claim_ttl: int = 600
+    # How long a completed stage is remembered to drop redeliveries
+    idempotency_completed_ttl: int = 3600
 
     @property
     def url(self) -> str:
@@ -78,6 +188,26 @@ class BrokerConfig(BaseModel):
     consumer_queue: str
     producer_queue: str
     dlx: str
+    queue_type: QueueType = QueueType.CLASSIC
+    delivery_limit: int | None = None
+    max_length: int | None = None
+    overflow: QueueOverflow | None = None
+    # Old consumer queue to drain after switching to another queue type
+    legacy_consumer_queue: str | None = None
+    # Payloads up to this size (bytes) travel inside the message instead
+    # of Redis. 0 disables inlining
+    inline_payload_max_size: int = 0
+
+    @model_validator(mode="after")
+    def check_queue_arguments(self) -> "BrokerConfig":
+        validate_queue_arguments(self.queue_type, self.delivery_limit, self.overflow)
+        return self
+
+    def fits_inline(self, payload: str) -> bool:
+        """Check if payload can be sent inside the broker message"""
+        if self.inline_payload_max_size <= 0:
+            return False
+        return len(payload.encode("utf-8")) <= self.inline_payload_max_size
 
     @property
     def connection_params(self) -> pika.ConnectionParameters:
@@ -1,3 +1,3 @@
-from .unit_of_work import UnitOfWork
+from .unit_of_work import UnitOfWork, ReadOnlyUnitOfWork
 
-__all__ = ["UnitOfWork"]
+__all__ = ["UnitOfWork", "ReadOnlyUnitOfWork"]
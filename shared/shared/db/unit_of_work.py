@@ -16,3 +16,23 @@ class UnitOfWork:
 
     async def rollback(self):
         await self.session.rollback()
+
+
+class ReadOnlyUnitOfWork(UnitOfWork):
+    """
+    Unit of work for read-only queries.
+
+    The session factory is resolved on enter by an async callable, so it can
+    pick a read replica (e.g. one that is not lagging) per unit of work.
+    """
+
+    def __init__(self, session_factory_getter):
+        self.session_factory_getter = session_factory_getter
+
+    async def __aenter__(self):
+        session_factory = await self.session_factory_getter()
+        self.session = session_factory()
+        return self
+
+    async def commit(self):
+        raise RuntimeError("Read-only unit of work can't be committed")
@@ -0,0 +1,88 @@
+"""
+Prometheus metrics (prometheus_client).
+
+Workers serve their metrics with `start_metrics_server`. The API renders
+them on `GET /metrics`. With several API worker processes, every process
+writes its metrics to files in PROMETHEUS_MULTIPROC_DIR and the scrape
+merges them, see `prepare_multiprocess_dir`.
+"""
+
+import logging
+import os
+import tempfile
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST as CONTENT_TYPE,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def prepare_multiprocess_dir() -> str:
+    """
+    Export an empty metrics directory to the processes started after it.
+
+    Must be called before the worker processes import prometheus_client.
+    Uses PROMETHEUS_MULTIPROC_DIR if it is set, else a new temporary dir.
+    """
+    path = os.environ.get(MULTIPROC_DIR_ENV) or tempfile.mkdtemp(prefix="metrics-")
+    os.makedirs(path, exist_ok=True)
+    # Files of a previous run would be merged into the new counters
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ[MULTIPROC_DIR_ENV] = path
+    return path
+
+
+def render_metrics() -> bytes:
+    """Metrics in Prometheus text format, of all processes in multiprocess mode"""
+    if MULTIPROC_DIR_ENV not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+def start_metrics_server(host: str, port: int):
+    """Serve metrics for the scraper from a thread (used by the workers)"""
+    start_http_server(port, addr=host)
+    logger.info(f"Serving metrics on {host}:{port}/metrics")
+
+
+# Metrics of the shared components
+
+MESSAGE_PROCESSING_SECONDS = Histogram(
+    "rmq_message_processing_seconds",
+    "Time spent processing a message, per stage",
+    ["stage"],
+    # LLM and PDF stages take up to minutes
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+MESSAGES_IN_FLIGHT = Gauge(
+    "rmq_messages_in_flight",
+    "Messages being processed, per stage",
+    ["stage"],
+    multiprocess_mode="livesum",
+)
+MESSAGES = Counter(
+    "rmq_messages",
+    "Processed messages by outcome (ack, dlq, requeue, last_resort), per stage",
+    ["stage", "outcome"],
+)
+REDIS_COMMAND_SECONDS = Histogram(
+    "redis_command_seconds",
+    "Duration of Redis commands and pipelines",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
@@ -1,7 +1,13 @@
-from typing import TYPE_CHECKING
+import zlib
+from typing import TYPE_CHECKING, Iterable
 from uuid import UUID
-from .broker_messages import Job, TaskSchema
+from .broker_messages import Job, JobFields, JobStage, StatusEnum, TaskEvent, TaskSchema
+from .metrics import REDIS_COMMAND_SECONDS
+from .timing import timing_span
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.client import NEVER_DECODE
+from redis.exceptions import WatchError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,6 +16,29 @@ if TYPE_CHECKING:
     from .config import RedisConfig
 
 
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with timing_span("redis"), REDIS_COMMAND_SECONDS.labels(
+            command="PIPELINE"
+        ).time():
+            return await super().execute(raise_on_error)
+
+
+class TimedRedis(Redis):
+    """Redis connection that reports its calls to the request timing and metrics"""
+
+    async def execute_command(self, *args, **options):
+        with timing_span("redis"), REDIS_COMMAND_SECONDS.labels(
+            command=str(args[0]).upper()
+        ).time():
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return TimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
 class RedisClient:
     def __init__(
         self,
@@ -19,7 +48,7 @@ class RedisClient:
         self.client = (
             redis
             if redis
-            else Redis(
+            else TimedRedis(
                 host=redis_config.host,
                 port=redis_config.port,
                 db=redis_config.db,
@@ -31,36 +60,139 @@ class RedisClient:
     def get_connection(self) -> Redis:
         return self.client
 
+    def pipeline(self) -> Pipeline:
+        """Non-transactional pipeline for the `queue_*` methods of the clients"""
+        return self.client.pipeline(transaction=False)
+
     async def close(self):
         if self.client:
             await self.client.aclose()
 
 
 class JobsRedisClient(RedisClient):
+    """
+    Jobs are stored as hashes. If `jobs_compression` is enabled, large text
+    fields are stored as `COMPRESSED_PREFIX + zlib(utf-8 text)`. Values are
+    read without decoding by the connection, so plain and compressed
+    hashes can be read either way.
+    """
+
+    COMPRESSED_FIELDS = frozenset({"input_text", "markdown"})
+    COMPRESSED_PREFIX = b"\x00zl1"
+
+    def _encode_fields(self, fields: dict) -> dict:
+        if not self.config.jobs_compression:
+            return fields
+        encoded = {}
+        for field, value in fields.items():
+            if field in self.COMPRESSED_FIELDS and isinstance(value, str):
+                raw = value.encode("utf-8")
+                if len(raw) >= self.config.jobs_compression_threshold:
+                    value = self.COMPRESSED_PREFIX + zlib.compress(
+                        raw, self.config.jobs_compression_level
+                    )
+            encoded[field] = value
+        return encoded
+
+    @classmethod
+    def _decode_value(cls, value: bytes | None) -> str | None:
+        if value is None:
+            return None
+        if value.startswith(cls.COMPRESSED_PREFIX):
+            value = zlib.decompress(value[len(cls.COMPRESSED_PREFIX) :])
+        return value.decode("utf-8")
+
     async def put_job(self, job: Job):
         name = f"job:{job.id}"
         await self.client.hset(
             name,
-            mapping=job.model_dump(exclude={"id"}),
+            mapping=self._encode_fields(job.model_dump(exclude={"id"})),
         )
         await self.client.expire(name, self.config.jobs_ttl)
 
+    def queue_put_job(self, pipe: Pipeline, job: Job):
+        name = f"job:{job.id}"
+        pipe.hset(name, mapping=self._encode_fields(job.model_dump(exclude={"id"})))
+        pipe.expire(name, self.config.jobs_ttl)
+
     async def get_job(self, id: UUID) -> Job | None:
         name = f"job:{id}"
-        data = await self.client.hgetall(name)
-        if not data:
+        raw = await self.client.execute_command("HGETALL", name, **{NEVER_DECODE: True})
+        if not raw:
             return None
+        data = {
+            field.decode("utf-8"): self._decode_value(value)
+            for field, value in raw.items()
+        }
         return Job(id=id, **data)
 
+    async def get_job_fields(
+        self, id: UUID | str, fields: Iterable[str]
+    ) -> JobFields | None:
+        """Load only the given Job fields (HMGET instead of HGETALL)"""
+        fields = list(fields)
+        unknown = set(fields) - set(JobFields.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+
+        values = await self.client.execute_command(
+            "HMGET", f"job:{id}", *fields, **{NEVER_DECODE: True}
+        )
+        if all(value is None for value in values):
+            return None
+        data = {
+            field: self._decode_value(value)
+            for field, value in zip(fields, values)
+            if value is not None
+        }
+        return JobFields(id=id, **data)
+
+    async def set_job_fields(self, id: UUID | str, **fields) -> bool:
+        """
+        Update only the given Job fields and refresh the job TTL.
+
+        An expired job is not recreated from a few fields, returns False then.
+        """
+        name = f"job:{id}"
+        while True:
+            async with self.client.pipeline() as pipe:
+                try:
+                    await pipe.watch(name)
+                    if not await pipe.exists(name):
+                        return False
+                    pipe.multi()
+                    pipe.hset(name, mapping=self._encode_fields(fields))
+                    pipe.expire(name, self.config.jobs_ttl)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    # Job changed since the check (e.g. expired), check again
+                    continue
+
     async def delete_job(self, task_id: UUID):
         await self.client.delete(f"job:{task_id}")
 
+    def queue_delete_job(self, pipe: Pipeline, task_id: UUID):
+        pipe.delete(f"job:{task_id}")
+
 
 class TasksRedisClient(RedisClient):
-    async def create_task(self, task: TaskSchema):
+    # Pub/sub channel with TaskEvent messages of all tasks
+    EVENTS_CHANNEL = "task-events"
+
+    @staticmethod
+    def _task_payload(task: TaskSchema) -> dict:
         payload = task.model_dump(exclude={"id"})
         payload.update(user_id=str(task.user_id))
-        return await self._create_task(task.id, payload)
+        return payload
+
+    async def create_task(self, task: TaskSchema):
+        return await self._create_task(task.id, self._task_payload(task))
+
+    def queue_create_task(self, pipe: Pipeline, task: TaskSchema):
+        name = f"task:{task.id}"
+        pipe.hset(name, mapping=self._task_payload(task))
+        pipe.expire(name, self.config.tasks_ttl)
 
     async def _create_task(self, task_id: UUID, payload: dict):
         name = f"task:{task_id}"
@@ -79,5 +211,175 @@ class TasksRedisClient(RedisClient):
             return None
         return TaskSchema(**payload, id=task_id)
 
+    async def lookup_task(self, task_id: UUID) -> tuple[TaskSchema | None, bool]:
+        """Task and whether it is known to be missing, in one round trip"""
+        async with self.pipeline() as pipe:
+            pipe.hgetall(f"task:{task_id}")
+            pipe.exists(f"task-missing:{task_id}")
+            payload, missing = await pipe.execute()
+        if payload:
+            return TaskSchema(**payload, id=task_id), False
+        return None, bool(missing)
+
+    async def cache_task(self, task: TaskSchema):
+        """Copy a finished task loaded from DB back to Redis"""
+        payload = {
+            key: value
+            for key, value in self._task_payload(task).items()
+            if value is not None
+        }
+        name = f"task:{task.id}"
+        async with self.pipeline() as pipe:
+            pipe.hset(name, mapping=payload)
+            pipe.expire(name, self.config.tasks_writeback_ttl)
+            await pipe.execute()
+
+    async def mark_task_missing(self, task_id: UUID):
+        await self.client.set(
+            f"task-missing:{task_id}", 1, ex=self.config.tasks_missing_ttl
+        )
+
+    async def get_tasks(self, task_ids: list[UUID]) -> dict[UUID, TaskSchema]:
+        """Get several tasks in one round trip. Missing tasks are omitted"""
+        async with self.pipeline() as pipe:
+            for task_id in task_ids:
+                pipe.hgetall(f"task:{task_id}")
+            payloads = await pipe.execute()
+        return {
+            task_id: TaskSchema(**payload, id=task_id)
+            for task_id, payload in zip(task_ids, payloads)
+            if payload
+        }
+
     async def delete_task(self, task_id: UUID):
         await self.client.delete(f"task:{task_id}")
+
+    def queue_delete_task(self, pipe: Pipeline, task_id: UUID):
+        pipe.delete(f"task:{task_id}")
+
+    async def publish_event(self, event: TaskEvent):
+        """Notify subscribers (e.g. SSE clients) about task transition"""
+        await self.client.publish(self.EVENTS_CHANNEL, event.model_dump_json())
+
+    async def fail_task(self, task_id: UUID):
+        """Set FAILED status of a task still in Redis and notify subscribers"""
+        key = f"task:{task_id}"
+        async with self.client.pipeline() as pipe:
+            try:
+                # Don't recreate an expired task without TTL
+                await pipe.watch(key)
+                if await pipe.exists(key):
+                    pipe.multi()
+                    pipe.hset(key, "status", StatusEnum.FAILED.value)
+                    await pipe.execute()
+            except WatchError:
+                pass
+        await self.publish_event(
+            TaskEvent(id=task_id, status=StatusEnum.FAILED, stage=JobStage.ERROR)
+        )
+
+
+class IdempotencyRedisClient(RedisClient):
+    """
+    Guard against processing the same message twice.
+
+    A worker claims `(stage, task_id)` with SET NX before doing the work and
+    marks it completed afterwards. The claim expires, so a task claimed by a
+    crashed worker can be taken by another one.
+    """
+
+    CLAIMED = "claimed"
+    COMPLETED = "completed"
+
+    @staticmethod
+    def _key(stage: str, task_id: UUID | str) -> str:
+        return f"idempotency:{stage}:{task_id}"
+
+    async def claim(self, stage: str, task_id: UUID | str) -> bool:
+        """Claim the task. Returns False if it is claimed or completed already"""
+        claimed = await self.client.set(
+            self._key(stage, task_id),
+            self.CLAIMED,
+            nx=True,
+            ex=self.config.idempotency_claim_ttl,
+        )
+        return bool(claimed)
+
+    async def is_completed(self, stage: str, task_id: UUID | str) -> bool:
+        return await self.client.get(self._key(stage, task_id)) == self.COMPLETED
+
+    async def complete(self, stage: str, task_id: UUID | str):
+        await self.client.set(
+            self._key(stage, task_id),
+            self.COMPLETED,
+            ex=self.config.idempotency_completed_ttl,
+        )
+
+    async def release(self, stage: str, task_id: UUID | str):
+        """Drop the claim so the retried message can be processed"""
+        key = self._key(stage, task_id)
+        # Keep the completed marker, only an unfinished claim is dropped
+        async with self.client.pipeline() as pipe:
+            try:
+                await pipe.watch(key)
+                if await pipe.get(key) == self.CLAIMED:
+                    pipe.multi()
+                    pipe.delete(key)
+                    await pipe.execute()
+            except WatchError:
+                # Completed or claimed again meanwhile
+                pass
+
+
+class TaskListCacheRedisClient(RedisClient):
+    """
+    Cache of the first pages of users' task lists (serialized JSON).
+
+    Each user has a hash with a version field and pages keyed by page size.
+    Pages are stored as "<version>|<next cursor>|<json>" and only match the
+    current version, so invalidation is a single HINCRBY and a page computed
+    before an invalidation can't be served after it.
+    """
+
+    VERSION_FIELD = "v"
+
+    @staticmethod
+    def _key(user_id: UUID) -> str:
+        # v2: pages are JSON lists with a cursor, not {"items", "next_cursor"}
+        return f"task-list:v2:{user_id}"
+
+    async def get_page(
+        self, user_id: UUID, limit: int
+    ) -> tuple[tuple[str, str | None] | None, int]:
+        """Cached page and its next cursor (None on miss), current list version"""
+        version, page = await self.client.hmget(
+            self._key(user_id), self.VERSION_FIELD, str(limit)
+        )
+        version = int(version or 0)
+        if page:
+            page_version, _, page = page.partition("|")
+            if page_version == str(version):
+                next_cursor, _, data = page.partition("|")
+                return (data, next_cursor or None), version
+        return None, version
+
+    async def set_page(
+        self,
+        user_id: UUID,
+        limit: int,
+        version: int,
+        data: str,
+        next_cursor: str | None = None,
+    ):
+        key = self._key(user_id)
+        async with self.pipeline() as pipe:
+            pipe.hset(key, str(limit), f"{version}|{next_cursor or ''}|{data}")
+            pipe.expire(key, self.config.task_list_ttl)
+            await pipe.execute()
+
+    async def invalidate(self, user_id: UUID):
+        key = self._key(user_id)
+        async with self.pipeline() as pipe:
+            pipe.hincrby(key, self.VERSION_FIELD, 1)
+            pipe.expire(key, self.config.task_list_ttl)
+            await pipe.execute()
@@ -7,6 +7,8 @@ from aio_pika import ExchangeType
 from aio_pika.abc import AbstractRobustChannel, AbstractExchange
 from pydantic import BaseModel
 
+from .config import QueueType, QueueOverflow
+
 if TYPE_CHECKING:
     from .config import TopologyConfig
 
@@ -20,6 +22,24 @@ class QueueConfig:
     name: str
     durable: bool = True
     arguments: dict | None = None
+    queue_type: QueueType = QueueType.CLASSIC
+    delivery_limit: int | None = None
+    max_length: int | None = None
+    overflow: QueueOverflow | None = None
+
+    @property
+    def declare_arguments(self) -> dict:
+        """Queue arguments including queue type and length limits"""
+        arguments = dict(self.arguments or {})
+        if self.queue_type != QueueType.CLASSIC:
+            arguments["x-queue-type"] = self.queue_type.value
+        if self.delivery_limit is not None:
+            arguments["x-delivery-limit"] = self.delivery_limit
+        if self.max_length is not None:
+            arguments["x-max-length"] = self.max_length
+        if self.overflow is not None:
+            arguments["x-overflow"] = self.overflow.value
+        return arguments
 
 
 @dataclass
@@ -66,16 +86,60 @@ class RabbitConfigurer:
         )
 
         # Queues configuration
-        self.main_queue_config = QueueConfig(
+        (
+            self.main_queue_config,
+            self.dlq_config,
+            self.last_resort_queue_config,
+        ) = self._build_queue_configs(config)
+
+        # Bindings configuration
+        self.bindings = self._build_bindings(config)
+
+        # Delayed redelivery of the main queue messages
+        self.delay_queue_config: QueueConfig | None = None
+        if config.delay_queue:
+            self.delay_queue_config = QueueConfig(
+                name=config.delay_queue,
+                durable=True,
+                arguments={
+                    "x-dead-letter-exchange": config.main_exchange,
+                    "x-dead-letter-routing-key": config.main_queue,
+                },
+                queue_type=config.queue_type,
+            )
+            self.bindings.append(
+                BindingConfig(config.delay_queue, config.dlx_name, config.delay_queue)
+            )
+
+        # Topology of the classic queue we are migrating from
+        self.legacy_queue_configs: list[QueueConfig] = []
+        legacy_config = config.get_legacy_topology()
+        if legacy_config:
+            self.legacy_queue_configs = list(self._build_queue_configs(legacy_config))
+            self.bindings.extend(self._build_bindings(legacy_config))
+
+        # Cache of declared exchanges
+        self._exchanges: dict[str, AbstractExchange] = {}
+
+    @staticmethod
+    def _build_queue_configs(
+        config: "TopologyConfig",
+    ) -> tuple[QueueConfig, QueueConfig, QueueConfig]:
+        """Build main queue, DLQ and last resort queue configurations"""
+        main_queue_config = QueueConfig(
             name=config.main_queue,
             durable=True,
             arguments={
                 "x-dead-letter-exchange": config.dlx_name,
                 "x-dead-letter-routing-key": config.dlq_name,
             },
+            queue_type=config.queue_type,
+            delivery_limit=config.delivery_limit,
+            max_length=config.max_length,
+            overflow=config.overflow,
         )
 
-        self.dlq_config = QueueConfig(
+        dlq_config = QueueConfig(
             name=config.dlq_name,
             durable=True,
             arguments={
@@ -83,15 +147,20 @@ class RabbitConfigurer:
                 "x-dead-letter-exchange": config.main_exchange,
                 "x-dead-letter-routing-key": config.main_queue,
             },
+            queue_type=config.queue_type,
         )
 
-        self.last_resort_queue_config = QueueConfig(
+        last_resort_queue_config = QueueConfig(
             name=config.last_resort_queue,
             durable=True,
+            queue_type=config.queue_type,
         )
+        return main_queue_config, dlq_config, last_resort_queue_config
 
-        # Bindings configuration
-        self.bindings = [
+    @staticmethod
+    def _build_bindings(config: "TopologyConfig") -> list[BindingConfig]:
+        """Build bindings of the main queue, DLQ and last resort queue"""
+        return [
             BindingConfig(config.main_queue, config.main_exchange, config.main_queue),
             BindingConfig(config.dlq_name, config.dlx_name, config.dlq_name),
             BindingConfig(
@@ -99,9 +168,6 @@ class RabbitConfigurer:
             ),
         ]
 
-        # Cache of declared exchanges
-        self._exchanges: dict[str, AbstractExchange] = {}
-
     async def _declare_exchange(self, config: ExchangeConfig) -> AbstractExchange:
         """Declare an exchange according to configuration"""
         exchange = await self._channel.declare_exchange(
@@ -116,13 +182,14 @@ class RabbitConfigurer:
 
     async def _declare_queue(self, config: QueueConfig):
         """Declare a queue according to configuration"""
+        arguments = config.declare_arguments
         queue = await self._channel.declare_queue(
             config.name,
             durable=config.durable,
-            arguments=config.arguments or {},
+            arguments=arguments,
             passive=False,  # Create if doesn't exist
         )
-        logger.debug(f"Declared queue: {config.name} (args={config.arguments})")
+        logger.debug(f"Declared queue: {config.name} (args={arguments})")
         return queue
 
     async def _bind_queue(self, binding: BindingConfig):
@@ -154,6 +221,11 @@ class RabbitConfigurer:
         await self._declare_queue(self.main_queue_config)
         await self._declare_queue(self.dlq_config)
         await self._declare_queue(self.last_resort_queue_config)
+        if self.delay_queue_config:
+            await self._declare_queue(self.delay_queue_config)
+        # Old classic queues are kept until they are drained
+        for queue_config in self.legacy_queue_configs:
+            await self._declare_queue(queue_config)
 
         # Step 3: Create bindings
         for binding in self.bindings:
@@ -192,6 +264,13 @@ class RabbitConfigurer:
                 self.last_resort_queue_config.name,
                 passive=True,
             )
+            if self.delay_queue_config:
+                await self._channel.declare_queue(
+                    self.delay_queue_config.name,
+                    passive=True,
+                )
+            for queue_config in self.legacy_queue_configs:
+                await self._channel.declare_queue(queue_config.name, passive=True)
 
             logger.info("Topology verification successful")
             return True
@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class RequestTiming:
+    """Total duration and number of calls per dependency during one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: dict[str, list[float]] = {}
+
+    def add(self, name: str, duration: float):
+        span = self.spans.setdefault(name, [0.0, 0])
+        span[0] += duration
+        span[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_dict(self) -> dict[str, float]:
+        """Durations in milliseconds"""
+        return {name: round(total * 1000, 2) for name, (total, _) in self.spans.items()}
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing header"""
+        metrics = [
+            f'{name};dur={total * 1000:.2f};desc="{count} calls"'
+            for name, (total, count) in self.spans.items()
+        ]
+        metrics.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+_current_timing: ContextVar[RequestTiming | None] = ContextVar(
+    "current_timing", default=None
+)
+
+
+def start_timing() -> RequestTiming:
+    """Start collecting spans for the current request (context)"""
+    timing = RequestTiming()
+    _current_timing.set(timing)
+    return timing
+
+
+def get_timing() -> RequestTiming | None:
+    return _current_timing.get()
+
+
+@contextmanager
+def timing_span(name: str):
+    """Add the duration of the block to the current request, if timed"""
+    timing = _current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
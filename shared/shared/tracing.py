@@ -0,0 +1,221 @@
+"""
+Trace context carried between services in RabbitMQ message headers.
+
+Every message gets the trace id of the current context (or a new one) and
+its publish time. Consumers restore the trace id, so messages published
+while processing continue the same trace, and export a span per stage
+with the queue wait and processing time. For retried messages the time
+since publishing includes the DLQ delays, so it is reported as retry wait.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from .config import TracingConfig
+
+logger = logging.getLogger(__name__)
+
+TRACE_ID_HEADER = "x-trace-id"
+PUBLISHED_AT_HEADER = "x-published-at"
+
+_current_trace_id: ContextVar[str | None] = ContextVar("current_trace_id", default=None)
+
+
+class Span(BaseModel):
+    trace_id: str
+    name: str
+    # Unix timestamps in seconds
+    start: float
+    end: float
+    # Time between publishing and receiving the message, None for local spans
+    # and retried messages
+    queue_wait: float | None = None
+    # Time between publishing and receiving a retried message, with DLQ delays
+    retry_wait: float | None = None
+    attributes: dict[str, str | int | float | bool] = {}
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span): ...
+
+
+_STOP = object()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends spans to a file as JSON lines.
+
+    Spans are queued and written in batches by a background thread, so
+    export doesn't block the event loop. Spans are dropped if the queue is
+    full.
+    """
+
+    def __init__(
+        self, path: str, flush_interval: float = 1.0, max_queue_size: int = 10000
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Write the queued spans and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch = [self._queue.get()]
+            # Collect the spans of one flush interval
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stopped = True
+                batch.pop()
+            self._write(batch)
+
+    def _write(self, spans: list[Span]):
+        if not spans:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(span.model_dump_json() + "\n" for span in spans)
+        except Exception:
+            logger.warning("Failed to export %d spans", len(spans), exc_info=True)
+
+
+class Tracer:
+    def __init__(self, exporter: SpanExporter | None = None):
+        self.exporter = exporter
+
+    @staticmethod
+    def current_trace_id() -> str | None:
+        return _current_trace_id.get()
+
+    def inject(self, headers: dict | None = None) -> dict:
+        """Headers of an outgoing message with the trace context"""
+        headers = dict(headers or {})
+        headers[TRACE_ID_HEADER] = _current_trace_id.get() or uuid4().hex
+        headers[PUBLISHED_AT_HEADER] = time.time()
+        return headers
+
+    def _export(self, span: Span):
+        try:
+            self.exporter.export(span)
+        except Exception:
+            logger.warning("Failed to export span", exc_info=True)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        queue_wait: float | None = None,
+        retry_wait: float | None = None,
+        **attributes,
+    ):
+        """Trace the block, in the current trace or a new one"""
+        trace_id = _current_trace_id.get()
+        token = None
+        if trace_id is None:
+            trace_id = uuid4().hex
+            token = _current_trace_id.set(trace_id)
+        start = time.time()
+        try:
+            yield trace_id
+        finally:
+            if self.exporter:
+                self._export(
+                    Span(
+                        trace_id=trace_id,
+                        name=name,
+                        start=start,
+                        end=time.time(),
+                        queue_wait=queue_wait,
+                        retry_wait=retry_wait,
+                        attributes=attributes,
+                    )
+                )
+            if token:
+                _current_trace_id.reset(token)
+
+    @contextmanager
+    def consume(self, name: str, headers: dict | None, retries: int = 0, **attributes):
+        """Continue the trace of an incoming message"""
+        headers = headers or {}
+        trace_id = headers.get(TRACE_ID_HEADER)
+        published_at = headers.get(PUBLISHED_AT_HEADER)
+        wait = None
+        if isinstance(published_at, (int, float)):
+            wait = max(0.0, time.time() - published_at)
+        # Dead-lettering keeps headers, so a retry's wait includes DLQ delays
+        queue_wait, retry_wait = (None, wait) if retries else (wait, None)
+
+        if isinstance(trace_id, bytes):
+            trace_id = trace_id.decode()
+        token = _current_trace_id.set(str(trace_id) if trace_id else uuid4().hex)
+        try:
+            with self.span(
+                name,
+                queue_wait=queue_wait,
+                retry_wait=retry_wait,
+                retries=retries,
+                **attributes,
+            ) as trace_id:
+                yield trace_id
+        finally:
+            _current_trace_id.reset(token)
+
+
+tracer = Tracer()
+
+
+def configure_tracing(config: "TracingConfig"):
+    """Set the exporter of the process-wide tracer"""
+    if isinstance(tracer.exporter, FileSpanExporter):
+        tracer.exporter.close()
+    tracer.exporter = None
+    if config.enabled:
+        tracer.exporter = FileSpanExporter(config.file_path, config.flush_interval)
+
+
+def load_spans(path: str) -> list[Span]:
+    with open(path, encoding="utf-8") as f:
+        return [Span.model_validate(json.loads(line)) for line in f if line.strip()]
@@ -0,0 +1,70 @@
+"""
+Per-request JWT cost for the supported algorithms.
+
+Keys are generated in memory, so no settings or certificates are needed:
+    python benchmarks/auth_cost.py --rounds 2000
+
+"cached" is the cost of a hit in the verified tokens cache
+(sha256 of the token + dict lookup), as done by `decode_jwt`.
+"""
+
+import argparse
+import hashlib
+import time
+from datetime import datetime, UTC, timedelta
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+
+def generate_keys():
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    return {
+        "RS256": (rsa_key, rsa_key.public_key()),
+        "ES256": (ec_key, ec_key.public_key()),
+        "EdDSA": (ed_key, ed_key.public_key()),
+    }
+
+
+def per_call_us(func, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = {
+        "type": "access",
+        "sub": "user@example.com",
+        "user_id": "0196b6f6-0000-7000-8000-000000000000",
+        "exp": datetime.now(UTC) + timedelta(minutes=15),
+    }
+    print(f"{'algorithm':<10}{'encode, us':>14}{'decode, us':>14}{'cached, us':>14}")
+    for algorithm, (private_key, public_key) in generate_keys().items():
+        token = jwt.encode(payload, private_key, algorithm=algorithm)
+        cache = {hashlib.sha256(token.encode()).digest(): payload}
+
+        encode = per_call_us(
+            lambda: jwt.encode(payload, private_key, algorithm=algorithm),
+            args.rounds,
+        )
+        decode = per_call_us(
+            lambda: jwt.decode(token, public_key, algorithms=[algorithm]),
+            args.rounds,
+        )
+        cached = per_call_us(
+            lambda: cache.get(hashlib.sha256(token.encode()).digest()),
+            args.rounds,
+        )
+        print(f"{algorithm:<10}{encode:>14.1f}{decode:>14.1f}{cached:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
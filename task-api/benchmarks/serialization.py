@@ -0,0 +1,99 @@
+"""
+Per-row cost of serializing a task list page.
+
+Rows are simulated in memory, so no database is needed:
+    python benchmarks/serialization.py --rows 10000
+
+"validated" mirrors the default FastAPI path: every TaskSchema is validated,
+the page is re-validated against `response_model` and encoded with
+`jsonable_encoder` + `json.dumps`. "direct" is the path used by
+`GET /tasks/`: models are built with `model_construct` and dumped to bytes
+by pydantic-core (`PydanticJSONResponse`).
+"""
+
+import argparse
+import gzip
+import json
+import time
+from dataclasses import dataclass
+from uuid import UUID, uuid4
+
+from shared import StatusEnum, TaskSchema
+from pydantic import BaseModel
+
+
+class TasksPage(BaseModel):
+    items: list[TaskSchema]
+    next_cursor: str | None = None
+
+
+@dataclass
+class Row:
+    id: UUID
+    pdf_url: str
+    user_id: UUID
+
+
+def validated(rows: list[Row]) -> bytes:
+    page = TasksPage(
+        items=[
+            TaskSchema(
+                id=row.id,
+                status=StatusEnum.READY,
+                pdf_url=row.pdf_url,
+                user_id=row.user_id,
+            )
+            for row in rows
+        ]
+    )
+    # response_model validation and encoding
+    page = TasksPage.model_validate(page.model_dump())
+    return json.dumps(page.model_dump(mode="json")).encode()
+
+
+def direct(rows: list[Row]) -> bytes:
+    page = TasksPage.model_construct(
+        items=[
+            TaskSchema.model_construct(
+                id=row.id,
+                status=StatusEnum.READY,
+                pdf_url=row.pdf_url,
+                user_id=row.user_id,
+            )
+            for row in rows
+        ],
+        next_cursor=None,
+    )
+    return page.__pydantic_serializer__.to_json(page)
+
+
+def per_row_us(func, rows: list[Row], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(rows)
+    return (time.perf_counter() - start) / rounds / len(rows) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    user_id = uuid4()
+    rows = [
+        Row(id=id, pdf_url=f"https://s3.example.com/pdf/{id}.pdf", user_id=user_id)
+        for id in (uuid4() for _ in range(args.rows))
+    ]
+    body = direct(rows)
+    assert json.loads(body) == json.loads(validated(rows))
+
+    print(f"rows={args.rows}")
+    for name, func in (("validated", validated), ("direct", direct)):
+        print(f"{name:<10}{per_row_us(func, rows, args.rounds):>8.2f} us/row")
+    compressed = gzip.compress(body, compresslevel=5)
+    print(f"body: {len(body) / 1024:.0f} KiB, gzip: {len(compressed) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
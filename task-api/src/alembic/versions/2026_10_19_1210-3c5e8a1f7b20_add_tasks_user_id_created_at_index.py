@@ -0,0 +1,42 @@
+"""Add tasks user_id created_at index
+
+Revision ID: 3c5e8a1f7b20
+Revises: 90a16b464da9
+Create Date: 2026-10-19 12:10:41.503219
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c5e8a1f7b20"
+down_revision: Union[str, Sequence[str], None] = "90a16b464da9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_user_id_created_at_id",
+            "tasks",
+            ["user_id", "created_at", "id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_tasks_user_id_created_at_id",
+            table_name="tasks",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
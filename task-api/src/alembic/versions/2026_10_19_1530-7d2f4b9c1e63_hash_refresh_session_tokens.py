@@ -0,0 +1,77 @@
+"""Hash refresh session tokens
+
+Revision ID: 7d2f4b9c1e63
+Revises: 3c5e8a1f7b20
+Create Date: 2026-10-19 15:30:12.804117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.core.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "7d2f4b9c1e63"
+down_revision: Union[str, Sequence[str], None] = "3c5e8a1f7b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "refresh_sessions",
+        sa.Column("token_hash", sa.LargeBinary(length=32), nullable=True),
+    )
+    op.add_column(
+        "refresh_sessions",
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Same digest as hash_token(), sha256() is built in since PostgreSQL 11.
+    # Tokens expire refresh_token_expire_days after the session was created
+    op.execute(
+        sa.text(
+            "UPDATE refresh_sessions SET "
+            "token_hash = sha256(convert_to(refresh_token, 'UTF8')), "
+            "expires_at = created_at + make_interval(days => :days)"
+        ).bindparams(days=settings.auth.refresh_token_expire_days)
+    )
+    op.alter_column("refresh_sessions", "token_hash", nullable=False)
+    op.alter_column("refresh_sessions", "expires_at", nullable=False)
+    op.create_unique_constraint(
+        op.f("uq_refresh_sessions_token_hash"), "refresh_sessions", ["token_hash"]
+    )
+    op.create_index(
+        op.f("ix_refresh_sessions_expires_at"),
+        "refresh_sessions",
+        ["expires_at"],
+        unique=False,
+    )
+    op.drop_constraint(
+        op.f("uq_refresh_sessions_refresh_token"), "refresh_sessions", type_="unique"
+    )
+    op.drop_column("refresh_sessions", "refresh_token")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Tokens can't be restored from digests, users have to log in again
+    op.execute("DELETE FROM refresh_sessions")
+    op.add_column(
+        "refresh_sessions",
+        sa.Column("refresh_token", sa.String(), nullable=False),
+    )
+    op.create_unique_constraint(
+        op.f("uq_refresh_sessions_refresh_token"),
+        "refresh_sessions",
+        ["refresh_token"],
+    )
+    op.drop_index(op.f("ix_refresh_sessions_expires_at"), table_name="refresh_sessions")
+    op.drop_constraint(
+        op.f("uq_refresh_sessions_token_hash"), "refresh_sessions", type_="unique"
+    )
+    op.drop_column("refresh_sessions", "expires_at")
+    op.drop_column("refresh_sessions", "token_hash")
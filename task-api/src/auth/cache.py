@@ -0,0 +1,90 @@
+import logging
+import time
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.auth.schemas import UserDTO
+from src.core.config import settings
+from src.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """
+    Two-tier cache of authenticated users keyed by email.
+
+    The in-process LRU is checked first, then Redis. Local entries live only
+    a few seconds because other processes can't invalidate them, Redis
+    entries are invalidated explicitly when the user changes.
+    """
+
+    def __init__(self, redis: Redis, local_size: int, local_ttl: int, redis_ttl: int):
+        self.redis = redis
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self._local: OrderedDict[str, tuple[float, UserDTO]] = OrderedDict()
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"user:{email}"
+
+    def _get_local(self, email: str) -> UserDTO | None:
+        entry = self._local.get(email)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._local[email]
+            return None
+        self._local.move_to_end(email)
+        return user
+
+    def _set_local(self, user: UserDTO):
+        email = str(user.email)
+        self._local[email] = (time.monotonic() + self.local_ttl, user)
+        self._local.move_to_end(email)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def get(self, email: str) -> UserDTO | None:
+        user = self._get_local(email)
+        if user:
+            return user
+        try:
+            data = await self.redis.get(self._key(email))
+        except RedisError:
+            logger.warning("Failed to read user from cache", exc_info=True)
+            return None
+        if not data:
+            return None
+        user = UserDTO.model_validate_json(data)
+        self._set_local(user)
+        return user
+
+    async def set(self, user: UserDTO):
+        self._set_local(user)
+        try:
+            await self.redis.set(
+                self._key(str(user.email)), user.model_dump_json(), ex=self.redis_ttl
+            )
+        except RedisError:
+            logger.warning("Failed to write user to cache", exc_info=True)
+
+    async def invalidate(self, email: str):
+        self._local.pop(email, None)
+        try:
+            await self.redis.delete(self._key(email))
+        except RedisError:
+            logger.warning("Failed to invalidate user cache", exc_info=True)
+
+
+user_cache = UserCache(
+    redis_client.get_connection(),
+    local_size=settings.user_cache.local_size,
+    local_ttl=settings.user_cache.local_ttl,
+    redis_ttl=settings.user_cache.redis_ttl,
+)
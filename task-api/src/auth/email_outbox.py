@@ -0,0 +1,132 @@
+import logging
+import time
+from uuid import uuid4
+
+from pydantic import BaseModel, Field, PrivateAttr
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxEmail(BaseModel):
+    """Email waiting to be sent by the email worker"""
+
+    # Makes every message unique, so equal emails are retried separately
+    id: str = Field(default_factory=lambda: uuid4().hex)
+    from_email: str
+    to_email: str
+    subject: str
+    body: str
+    attempts: int = 0
+    # Value in the processing list, to remove the email when it's handled
+    _raw: str | None = PrivateAttr(default=None)
+
+
+class EmailOutbox:
+    """
+    Queue of outgoing emails in Redis.
+
+    New emails are appended to a list. Taken emails are moved to the
+    processing list of the worker and removed from it once sent or failed,
+    so emails of a crashed worker are recovered when it starts again.
+    Failed ones wait in a sorted set scored by the time of the next attempt,
+    and emails that ran out of attempts are moved to the dead list for
+    inspection.
+    """
+
+    QUEUE_KEY = "email-outbox"
+    RETRY_KEY = "email-outbox:retry"
+    DEAD_KEY = "email-outbox:dead"
+    PROCESSING_KEY = "email-outbox:processing"
+
+    def __init__(
+        self,
+        redis: Redis,
+        max_attempts: int,
+        retry_delay: float,
+        worker_name: str = "default",
+    ):
+        self.redis = redis
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # Every worker has its own processing list
+        self.processing_key = f"{self.PROCESSING_KEY}:{worker_name}"
+
+    async def put(self, email: OutboxEmail):
+        await self.redis.rpush(self.QUEUE_KEY, email.model_dump_json())
+
+    async def pop_batch(self, size: int, timeout: float) -> list[OutboxEmail]:
+        """Wait up to timeout seconds for emails and take up to size of them"""
+        value = await self.redis.blmove(
+            self.QUEUE_KEY, self.processing_key, timeout, "LEFT", "RIGHT"
+        )
+        if value is None:
+            return []
+        values = [value]
+        if size > 1:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for _ in range(size - 1):
+                    pipe.lmove(self.QUEUE_KEY, self.processing_key, "LEFT", "RIGHT")
+                values += [value for value in await pipe.execute() if value]
+        emails = []
+        for value in values:
+            email = OutboxEmail.model_validate_json(value)
+            email._raw = value
+            emails.append(email)
+        return emails
+
+    async def done(self, email: OutboxEmail):
+        """Remove the sent email from the processing list"""
+        await self.redis.lrem(self.processing_key, 1, email._raw)
+
+    async def fail(self, email: OutboxEmail):
+        """Schedule the next attempt with exponential backoff or give up"""
+        raw = email._raw
+        email = email.model_copy(update={"attempts": email.attempts + 1})
+        async with self.redis.pipeline() as pipe:
+            if raw is not None:
+                pipe.lrem(self.processing_key, 1, raw)
+            if email.attempts >= self.max_attempts:
+                logger.error(
+                    f"Email {email.id} to {email.to_email} failed after"
+                    f" {email.attempts} attempts. Moving to dead list."
+                )
+                pipe.rpush(self.DEAD_KEY, email.model_dump_json())
+            else:
+                due = time.time() + self.retry_delay * 2 ** (email.attempts - 1)
+                pipe.zadd(self.RETRY_KEY, {email.model_dump_json(): due})
+            await pipe.execute()
+
+    async def recover(self) -> int:
+        """Return emails left in the processing list (e.g. after a crash) to
+        the head of the queue. They may be sent twice"""
+        moved = 0
+        while await self.redis.lmove(
+            self.processing_key, self.QUEUE_KEY, "RIGHT", "LEFT"
+        ):
+            moved += 1
+        return moved
+
+    async def requeue_due(self, limit: int = 1000) -> int:
+        """Move emails whose retry time has come back to the queue"""
+        due = await self.redis.zrangebyscore(
+            self.RETRY_KEY, "-inf", time.time(), start=0, num=limit
+        )
+        moved = 0
+        for value in due:
+            # Only the worker that removed the email requeues it
+            if await self.redis.zrem(self.RETRY_KEY, value):
+                await self.redis.rpush(self.QUEUE_KEY, value)
+                moved += 1
+        return moved
+
+
+email_outbox = EmailOutbox(
+    redis_client.get_connection(),
+    max_attempts=settings.email.outbox_max_attempts,
+    retry_delay=settings.email.outbox_retry_delay,
+    worker_name=settings.email.outbox_worker_name,
+)
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from typing import AsyncIterator
+
+import aiosmtplib
+
+from shared import configure_logging
+from src.auth.email_outbox import EmailOutbox, OutboxEmail, email_outbox
+from src.auth.send_email import build_message
+from src.core.config import settings
+from src.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """
+    Fixed number of SMTP connections kept open between sends.
+
+    Connections are opened lazily and reopened when the server closes them
+    (e.g. after its idle timeout).
+    """
+
+    def __init__(self, size: int, **smtp_params):
+        self._clients: asyncio.Queue[aiosmtplib.SMTP] = asyncio.Queue()
+        for _ in range(size):
+            self._clients.put_nowait(aiosmtplib.SMTP(**smtp_params))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        client = await self._clients.get()
+        try:
+            if not client.is_connected:
+                await client.connect()
+            yield client
+        finally:
+            self._clients.put_nowait(client)
+
+    async def send(self, message: EmailMessage):
+        async with self.acquire() as client:
+            try:
+                await client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Connection was dropped while idle, retry once on a new one
+                client.close()
+                await client.connect()
+                await client.send_message(message)
+            except (aiosmtplib.SMTPTimeoutError, ConnectionError):
+                client.close()
+                raise
+
+    async def close(self):
+        while not self._clients.empty():
+            client = self._clients.get_nowait()
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+
+
+class EmailWorker:
+    """Sends queued emails in batches, failed ones are retried later"""
+
+    def __init__(
+        self,
+        outbox: EmailOutbox,
+        pool: SMTPConnectionPool,
+        batch_size: int,
+        poll_timeout: float = 1,
+    ):
+        self.outbox = outbox
+        self.pool = pool
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+
+    async def _send(self, email: OutboxEmail):
+        try:
+            await self.pool.send(build_message(email))
+        except Exception:
+            logger.exception(
+                f"Failed to send email {email.id} to {email.to_email}"
+                f" (attempt {email.attempts + 1})"
+            )
+            await self.outbox.fail(email)
+        else:
+            logger.info("Email %s sent to %s", email.id, email.to_email)
+            await self.outbox.done(email)
+
+    async def process_batch(self) -> int:
+        await self.outbox.requeue_due()
+        batch = await self.outbox.pop_batch(self.batch_size, self.poll_timeout)
+        # Emails share the pool connections, each sends one email at a time
+        await asyncio.gather(*(self._send(email) for email in batch))
+        return len(batch)
+
+    async def run(self):
+        recovered = await self.outbox.recover()
+        if recovered:
+            logger.info("Recovered %d emails of the previous run", recovered)
+        while True:
+            try:
+                await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email worker iteration failed")
+                await asyncio.sleep(self.poll_timeout)
+
+
+async def main():
+    """Main function to start the email worker"""
+    configure_logging()
+
+    pool = SMTPConnectionPool(
+        settings.email.smtp_connections,
+        hostname=settings.email.smtp_host,
+        port=settings.email.smtp_port,
+        username=settings.email.smtp_user or None,
+        password=settings.email.smtp_password or None,
+        start_tls=settings.email.smtp_start_tls,
+        use_tls=settings.email.smtp_use_tls,
+        timeout=settings.email.smtp_timeout,
+    )
+    worker = EmailWorker(
+        email_outbox, pool, batch_size=settings.email.outbox_batch_size
+    )
+    logger.info("Starting email worker")
+    try:
+        await worker.run()
+    finally:
+        await pool.close()
+        await redis_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy import delete, select
+from sqlalchemy import delete, func, select
 from src.core.models.refresh_session import RefreshSession
 
 
@@ -28,8 +28,22 @@ class AuthRepository:
         await session.execute(stmt)
         await session.flush()
 
-    async def delete_by_token(self, session: AsyncSession, token: str):
-        """Delete session by token"""
-        stmt = delete(RefreshSession).filter_by(refresh_token=token)
+    async def delete_by_token_hash(self, session: AsyncSession, token_hash: bytes):
+        """Delete session by token digest"""
+        stmt = delete(RefreshSession).filter_by(token_hash=token_hash)
         await session.execute(stmt)
         await session.flush()
+
+    async def delete_expired(self, session: AsyncSession, batch_size: int) -> int:
+        """Delete up to batch_size expired sessions, return number of deleted"""
+        expired_ids = (
+            select(RefreshSession.id)
+            .where(RefreshSession.expires_at < func.now())
+            .limit(batch_size)
+            # Concurrent purges (one per API worker) take different rows
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = delete(RefreshSession).where(RefreshSession.id.in_(expired_ids))
+        result = await session.execute(stmt)
+        return result.rowcount
@@ -1,8 +1,8 @@
 from email.message import EmailMessage
 
-import aiosmtplib
 import logging
 
+from src.auth.email_outbox import OutboxEmail, email_outbox
 from src.auth.utils import encode_jwt, decode_jwt
 from src.core.exceptions import InvalidTokenError
 from src.core.config import settings
@@ -11,32 +11,27 @@ from urllib.parse import urlencode
 logger = logging.getLogger(__name__)
 
 
+def build_message(email: OutboxEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = email.from_email
+    message["To"] = email.to_email
+    message["Subject"] = email.subject
+    message.set_content(email.body)
+    return message
+
+
 async def send_email(
     from_email: str,
     to_email: str,
     subject: str,
     body: str,
 ):
-    message = EmailMessage()
-    message["From"] = from_email
-    message["To"] = to_email
-    message["Subject"] = subject
-    message.set_content(body)
-    try:
-        await aiosmtplib.send(
-            message,
-            hostname=settings.email.smtp_host,
-            port=settings.email.smtp_port,
-            username=settings.email.smtp_user,
-            password=settings.email.smtp_password,
-            start_tls=settings.email.smtp_start_tls,
-            use_tls=settings.email.smtp_use_tls,
-        )
-        logger.info("Verification email sent to %s", to_email)
-    except Exception as e:
-        # log exception details for diagnostics and re-raise so caller can handle it
-        logger.exception("Failed to send verification email to %s: %s", to_email, e)
-        raise
+    """Queue the email, it's sent by the email worker"""
+    email = OutboxEmail(
+        from_email=from_email, to_email=to_email, subject=subject, body=body
+    )
+    await email_outbox.put(email)
+    logger.info("Email %s to %s queued", email.id, to_email)
 
 
 def generate_link_for_verification(token: str) -> str:
@@ -52,6 +47,8 @@ def create_token_for_verification(email: str):
 async def send_verification_email(
     email: str,
 ):
+    # Link is valid for verification_token_expire_minutes from queueing,
+    # longer than all retries of the email worker take
     token = create_token_for_verification(email)
     admin_email = settings.email.default_from
     await send_email(
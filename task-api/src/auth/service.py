@@ -1,15 +1,24 @@
-import asyncio
+import logging
+from redis.exceptions import RedisError
 from sqlalchemy.ext.asyncio.session import AsyncSession
 from uuid import uuid4, UUID
-from datetime import datetime, UTC
+from datetime import datetime, UTC, timedelta
 
 from shared import UnitOfWork
 from src.core.models import User
 from src.core.config import settings
+from .cache import UserCache
 from .repository import AuthRepository
 from .send_email import verify_verification_token, send_verification_email
 from .user_repository import UserRepository
-from .utils import decode_jwt, encode_jwt, verify_password, get_password_hash
+from .utils import (
+    decode_jwt,
+    encode_jwt,
+    hash_token,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
+)
 from .schemas import LoginSchema, RegisterSchema, UserDTO
 from .token import Token
 from src.core.exceptions import (
@@ -21,6 +30,8 @@ from src.core.exceptions import (
     ForbiddenError,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     def __init__(
@@ -28,10 +39,12 @@ class AuthService:
         uow: UnitOfWork,
         user_repository: UserRepository,
         auth_repository: AuthRepository,
+        user_cache: UserCache,
     ):
         self.uow = uow
         self.user_repository = user_repository
         self.auth_repository = auth_repository
+        self.user_cache = user_cache
 
     def _create_token(self, payload: dict, token_type: str, expire_minutes: int) -> str:
         """Create JWT token"""
@@ -74,7 +87,15 @@ class AuthService:
             user = await self.user_repository.get_by_id(session, user_id)
         access_token = self._create_access_token(user)
         refresh_token = self._create_refresh_token(str(user.email))
-        data = {"refresh_token": refresh_token, "user_id": user_id}
+        # Not earlier than the token `exp`, expired sessions are purged by it
+        expires_at = datetime.now(UTC) + timedelta(
+            days=settings.auth.refresh_token_expire_days
+        )
+        data = {
+            "token_hash": hash_token(refresh_token),
+            "expires_at": expires_at,
+            "user_id": user_id,
+        }
         await self.auth_repository.create(session, data)
         await session.commit()
         return Token(
@@ -94,14 +115,18 @@ class AuthService:
 
             user_data = {
                 "email": str(data.email),
-                "password_hash": get_password_hash(data.password),
+                "password_hash": await get_password_hash_async(data.password),
                 "is_verified": False,
                 "is_deleted": False,
                 "is_superuser": False,
             }
             user = await self.user_repository.create(uow.session, user_data)
             await uow.commit()
-            asyncio.create_task(send_verification_email(data.email))
+            try:
+                await send_verification_email(str(data.email))
+            except RedisError:
+                # User is created anyway and can request the email again
+                logger.exception("Failed to queue verification email")
             return await self._create_tokens(uow.session, user.id, user)
 
     async def login(self, data: LoginSchema) -> Token:
@@ -110,8 +135,11 @@ class AuthService:
             user = await self.user_repository.get_by_email(uow.session, str(data.email))
             if not user:
                 raise EmailNotExistsError()
-            if not verify_password(data.password, user.password_hash):
+            if not await verify_password_async(data.password, user.password_hash):
                 raise InvalidPasswordError()
+            # Upgrade hash if cost factor was changed, saved with the session
+            if password_needs_rehash(user.password_hash):
+                user.password_hash = await get_password_hash_async(data.password)
             return await self._create_tokens(uow.session, user.id, user)
 
     async def create_token(self, user_id: UUID) -> Token:
@@ -122,7 +150,9 @@ class AuthService:
     async def logout(self, refresh_token: str) -> None:
         """User logout (delete refresh token)"""
         async with self.uow as uow:
-            await self.auth_repository.delete_by_token(uow.session, refresh_token)
+            await self.auth_repository.delete_by_token_hash(
+                uow.session, hash_token(refresh_token)
+            )
             await uow.commit()
 
     async def refresh_token(self, refresh_token: str) -> Token:
@@ -130,12 +160,12 @@ class AuthService:
         async with self.uow as uow:
             token = await self.auth_repository.get_by_filters(
                 uow.session,
-                {"refresh_token": refresh_token},
+                {"token_hash": hash_token(refresh_token)},
             )
             if token is None:
                 raise InvalidTokenError()
 
-            payload = decode_jwt(token.refresh_token)
+            payload = decode_jwt(refresh_token)
             if (
                 payload.get(settings.auth.token_type_field)
                 != settings.auth.refresh_token_field
@@ -158,10 +188,13 @@ class AuthService:
     async def abort_all_sessions(self, user_id: UUID) -> None:
         """Terminate all user sessions"""
         async with self.uow as uow:
+            user = await self.user_repository.get_by_id(uow.session, user_id)
             await self.auth_repository.delete_multi(
                 session=uow.session, user_id=user_id
             )
             await uow.commit()
+        if user:
+            await self.user_cache.invalidate(str(user.email))
 
     async def change_password(
         self, email: str, old_password: str, new_password: str
@@ -171,18 +204,26 @@ class AuthService:
             user = await self.user_repository.get_by_email(uow.session, email)
             if not user:
                 raise EmailNotExistsError()
-            if not verify_password(old_password, user.password_hash):
+            if not await verify_password_async(old_password, user.password_hash):
                 raise InvalidPasswordError()
-            user.password_hash = get_password_hash(new_password)
+            user.password_hash = await get_password_hash_async(new_password)
             await uow.commit()
+        await self.user_cache.invalidate(email)
 
     async def get_by_email(self, email: str) -> UserDTO:
         """Get user by email"""
+        cached = await self.user_cache.get(email)
+        if cached:
+            return cached
+        # The result is cached, so read the primary: a lagging replica would
+        # put back a user that verify_account / change_password just invalidated
         async with self.uow as uow:
             user = await self.user_repository.get_by_email(uow.session, email)
-            if not user:
-                raise EmailNotExistsError()
-            return UserDTO.model_validate(user)
+        if not user:
+            raise EmailNotExistsError()
+        user_dto = UserDTO.model_validate(user)
+        await self.user_cache.set(user_dto)
+        return user_dto
 
     async def verify_account(self, token: str):
         async with self.uow as uow:
@@ -201,6 +242,7 @@ class AuthService:
 
             user.is_verified = True
             await uow.commit()
+        await self.user_cache.invalidate(email)
 
     async def send_verify_email(self, email: str):
         async with self.uow as uow:
@@ -209,4 +251,4 @@ class AuthService:
                 raise EmailNotExistsError
             if user.is_verified:
                 raise ForbiddenError("You are already verified")
-        asyncio.create_task(send_verification_email(email))
+        await send_verification_email(email)
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core.config import settings
+from src.core.db import db_helper
+from .repository import AuthRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiredSessionsPurger:
+    """
+    Periodically deletes expired refresh sessions.
+
+    Rows are deleted in small batches, each in its own transaction, so the
+    purge doesn't hold locks that slow down login and refresh.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        repository: AuthRepository,
+        interval: float,
+        batch_size: int,
+    ):
+        self.session_factory = session_factory
+        self.repository = repository
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    async def purge(self) -> int:
+        """Delete all expired sessions, return number of deleted"""
+        total = 0
+        while True:
+            async with self.session_factory() as session:
+                deleted = await self.repository.delete_expired(session, self.batch_size)
+                await session.commit()
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await self.purge()
+                if deleted:
+                    logger.info(f"Purged {deleted} expired refresh sessions")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to purge expired refresh sessions")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+expired_sessions_purger = ExpiredSessionsPurger(
+    session_factory=db_helper.session_factory,
+    repository=AuthRepository(),
+    interval=settings.auth.sessions_purge_interval,
+    batch_size=settings.auth.sessions_purge_batch_size,
+)
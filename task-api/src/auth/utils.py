@@ -1,16 +1,84 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
 import jwt
-from jwt import DecodeError
+from jwt import InvalidTokenError as JWTInvalidTokenError
+from jwt.algorithms import get_default_algorithms
 from src.core.config import settings
 import bcrypt
 from datetime import datetime, UTC, timedelta
 
-from src.core.exceptions import InvalidTokenError
+from src.core.exceptions import InvalidTokenError, ServiceUnavailableError
+
+
+def load_key(pem: str, algorithm: str = settings.auth.algorithm):
+    """Parse PEM key once instead of on every encode/decode call"""
+    return get_default_algorithms()[algorithm].prepare_key(pem)
+
+
+PRIVATE_KEY = load_key(settings.auth.private_key_path.read_text())
+PUBLIC_KEY = load_key(settings.auth.public_key_path.read_text())
+
+
+class VerifiedTokensCache:
+    """
+    LRU cache of already verified access tokens keyed by token digest.
+
+    Entries are dropped when the token expires, so the `exp` check of the
+    caller still works for cached tokens. Only tokens verified with the
+    module key are cached, so the key is not part of the cache key.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._tokens: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(jwt_token: str | bytes, algorithm: str) -> tuple:
+        if isinstance(jwt_token, str):
+            jwt_token = jwt_token.encode("utf-8")
+        return algorithm, hashlib.sha256(jwt_token).digest()
+
+    def get(self, jwt_token: str | bytes, algorithm: str) -> dict | None:
+        key = self._key(jwt_token, algorithm)
+        entry = self._tokens.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._tokens[key]
+            return None
+        self._tokens.move_to_end(key)
+        return dict(payload)
+
+    def set(self, jwt_token: str | bytes, algorithm: str, payload: dict):
+        # Refresh and verification tokens are rare and long-lived
+        if (
+            payload.get(settings.auth.token_type_field)
+            != settings.auth.access_token_field
+        ):
+            return
+        expires_at = payload.get("exp")
+        # Don't cache tokens without expiration or already expired ones
+        if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        key = self._key(jwt_token, algorithm)
+        self._tokens[key] = (expires_at, dict(payload))
+        self._tokens.move_to_end(key)
+        while len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+
+
+verified_tokens_cache = VerifiedTokensCache(settings.auth.verified_tokens_cache_size)
 
 
 def encode_jwt(
     payload: dict,
     expire_minutes: int,
-    private_key: str = settings.auth.private_key_path.read_text(),
+    private_key=PRIVATE_KEY,
     algorithm: str = settings.auth.algorithm,
 ) -> str:
     to_encode = payload.copy()
@@ -26,18 +94,31 @@ def encode_jwt(
 
 def decode_jwt(
     jwt_token: str | bytes,
-    public_key: str = settings.auth.public_key_path.read_text(),
+    public_key=PUBLIC_KEY,
     algorithm: str = settings.auth.algorithm,
 ) -> dict:
+    use_cache = public_key is PUBLIC_KEY
+    if use_cache:
+        decoded_jwt = verified_tokens_cache.get(jwt_token, algorithm)
+        if decoded_jwt is not None:
+            return decoded_jwt
     try:
         decoded_jwt = jwt.decode(
             jwt_token, public_key, algorithms=[algorithm], options={"verify_exp": False}
         )
-    except DecodeError:
+    except JWTInvalidTokenError:
+        # Bad format, signature or algorithm
         raise InvalidTokenError("Error decoding jwt token")
+    if use_cache:
+        verified_tokens_cache.set(jwt_token, algorithm, decoded_jwt)
     return decoded_jwt
 
 
+def hash_token(token: str) -> bytes:
+    """Digest of a token to store and look up instead of the token itself"""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode("utf-8"), hashed_password.encode("utf-8")
@@ -45,4 +126,56 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    salt = bcrypt.gensalt(rounds=settings.password.rounds)
+    return bcrypt.hashpw(password.encode("utf-8"), salt).decode("utf-8")
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check if hash was made with another cost factor ($2b$<cost>$...)"""
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != settings.password.rounds
+
+
+class PasswordHashingExecutor:
+    """
+    Runs bcrypt in a bounded thread pool so it doesn't block the event loop.
+
+    When too many calls are waiting for a thread, new ones are rejected
+    with 503 instead of growing the queue.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hashing"
+        )
+        self._pending = 0
+
+    async def run(self, func, *args):
+        if self._pending >= self.max_pending:
+            raise ServiceUnavailableError("Too many login requests", retry_after=1)
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+
+password_hashing_executor = PasswordHashingExecutor(
+    workers=settings.password.workers,
+    max_pending=settings.password.max_pending,
+)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hashing_executor.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hashing_executor.run(get_password_hash, password)
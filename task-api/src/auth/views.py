@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, Response, status, Request
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.responses import HTMLResponse
-from src.core.limiter import limiter
+from src.core.limiter import rate_limit
 from .schemas import LoginSchema, RegisterSchema, UserDTO
 from .token import Token
 from src.core.dependencies import (
@@ -117,10 +117,11 @@ async def verify_account(
         return "<h3>Неверная или просроченная ссылка</h3>"
 
 
-@router.get("/send-verification-email")
-@limiter.limit("1/3minute")
+@router.get(
+    "/send-verification-email",
+    dependencies=[rate_limit("1/3minute", scope="send_verify_email")],
+)
 async def send_verify_email(
-    request: Request,
     service: AuthServiceDep,
     user: UserDTO = Depends(get_current_user),
 ):
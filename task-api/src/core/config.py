@@ -1,10 +1,11 @@
+import os
 from pathlib import Path
 from typing import Optional, Literal
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from shared import RedisConfig, BrokerConfig
+from shared import RedisConfig, BrokerConfig, MetricsConfig, TracingConfig
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 ENV_PATH = BASE_DIR / ".env"
@@ -47,8 +48,15 @@ class DatabaseConfig(BaseModel):
     host: str
     port: int
     echo: bool = False
+    # Connections for the whole API, divided between worker processes
     pool_size: int = 50
     max_overflow: int = 10
+    # Read replicas for read-only queries (SQLAlchemy URLs, JSON list in env)
+    replica_urls: list[str] = []
+    # Replicas lagging more than this (seconds) are skipped
+    replica_max_lag: float = 1.0
+    # How often replica lag is checked, in seconds
+    replica_check_interval: float = 5.0
     naming_convention: dict[str, str] = {
         "ix": "ix_%(column_0_label)s",
         "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -62,10 +70,41 @@ class DatabaseConfig(BaseModel):
         return f"postgresql+asyncpg://{self.user}:{self.password}@{self.host}:{self.port}/{self.name}"
 
 
+# Number of uvicorn worker processes, set by the API entrypoint for them.
+# Other processes (tasks consumer, purge, email worker) don't have it
+API_WORKERS_ENV = "TASK_API_WORKERS"
+
+
 class RunConfig(BaseModel):
+    # Production mode: several worker processes and no autoreload
+    production: bool = False
     reload: bool = True
     host: str = "0.0.0.0"
     port: int = 8000
+    # Worker processes in production mode, 0 means one per CPU
+    workers: int = 0
+    # "auto" uses uvloop and httptools when they are installed
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+
+    @property
+    def workers_count(self) -> int:
+        if not self.production:
+            return 1
+        return self.workers or os.cpu_count() or 1
+
+
+class TimingConfig(BaseModel):
+    """Per-request timing of dependencies, logged and sent as Server-Timing"""
+
+    enabled: bool = False
+    # Share of requests that are timed
+    sample_rate: float = 0.1
+    # Timings expose internals (DB, Redis), so the Server-Timing header is
+    # only sent when enabled here, or to requests with a matching
+    # X-Debug-Token header. Such requests are always timed
+    expose_header: bool = False
+    debug_token: str | None = None
 
 
 class ApiPrefix(BaseModel):
@@ -73,25 +112,118 @@ class ApiPrefix(BaseModel):
     tasks: str = "/tasks"
 
 
+class RateLimitConfig(BaseModel):
+    """Settings for rate limits shared by all API processes"""
+
+    enabled: bool = True
+    # Limits storage URI, Redis from `redis` settings by default. The async
+    # storage of `limits` is used, so the scheme gets the `async+` prefix
+    storage_uri: Optional[str] = None
+    # moving-window is an exact sliding window (atomic Lua script in Redis)
+    strategy: Literal["fixed-window", "moving-window", "sliding-window-counter"] = (
+        "moving-window"
+    )
+    key_prefix: str = "rate-limit"
+    # Add X-RateLimit-* headers to limited routes
+    headers_enabled: bool = True
+    # Keep limiting per process while Redis is unavailable
+    in_memory_fallback: bool = True
+
+
 class TasksSettings(BaseModel):
     """Settings for tasks processing"""
 
     # Maximum input data size in bytes (64 KB by default)
     max_input_size: int = 1024 * 64
-    # Rate limit for task creation (string format for slowapi limiter)
+    # Max body size in bytes of task creation requests, rejected with 413
+    # before parsing. JSON may escape non-ASCII text as \uXXXX, which makes
+    # Cyrillic text 3 times larger than in UTF-8
+    max_request_size: int = 1024 * 64 * 3 + 1024
+    max_batch_request_size: int = 1024 * 1024 * 8
+    # Rate limit for single task creation per user (`limits` string notation),
+    # shared by POST /tasks and /tasks/markdown
     rate_limit: str = "3/5minute"
+    # Max number of tasks in a batch request
+    max_batch_size: int = 100
+    # Rate limit for POST /tasks/batch per user, every task of a batch counts
+    # as a hit. Separate from `rate_limit`, which would reject any batch of
+    # more than 3 tasks
+    batch_rate_limit: str = "100/5minute"
+    # Interval between SSE keepalive comments in seconds
+    events_keepalive: int = 15
+    # Max lifetime of SSE stream in seconds
+    events_timeout: int = 300
+    # Max wait time of long-poll request in seconds
+    long_poll_timeout: int = 30
+    # Page size of the task list
+    page_size: int = 50
+    max_page_size: int = 200
 
 
 class AuthJWTConfig(BaseModel):
     private_key_path: Path = BASE_DIR / "src" / "certs" / "jwt-private.pem"
     public_key_path: Path = BASE_DIR / "src" / "certs" / "jwt-public.pem"
-    algorithm: str = "RS256"
+    # Key pair must match the algorithm. EdDSA (Ed25519) and ES256 (P-256)
+    # sign several times faster than RS256 (see benchmarks/auth_cost.py)
+    algorithm: Literal["RS256", "ES256", "EdDSA"] = "RS256"
+    # Max number of verified tokens kept in memory
+    verified_tokens_cache_size: int = 10000
     refresh_token_expire_days: int = 30
     access_token_expire_minutes: int = 15
     token_type_field: str = "type"
     access_token_field: str = "access"
     refresh_token_field: str = "refresh"
     refresh_token_cookie_max_age: int = 30 * 24 * 60 * 60
+    # Expired refresh sessions are deleted in the background every interval
+    # (seconds), in batches so the table is not locked for long
+    sessions_purge_interval: int = 3600
+    sessions_purge_batch_size: int = 1000
+
+
+class PasswordHashingConfig(BaseModel):
+    """Settings for bcrypt password hashing"""
+
+    # bcrypt cost factor. Hashes with other cost are rehashed on login
+    rounds: int = 12
+    # Threads used for hashing, so the event loop is not blocked
+    workers: int = 4
+    # Max hashing calls waiting for a thread before returning 503
+    max_pending: int = 64
+
+
+class UserCacheConfig(BaseModel):
+    """Settings for cache of authenticated users"""
+
+    # Max number of users in the in-process LRU
+    local_size: int = 1024
+    # In-process entries lifetime in seconds
+    local_ttl: int = 5
+    # Redis entries lifetime in seconds
+    redis_ttl: int = 60
+
+
+class AdmissionConfig(BaseModel):
+    """Settings for rejecting new tasks while the processing queue is backed up"""
+
+    enabled: bool = True
+    # New tasks are rejected with 503 if their estimated wait in the first
+    # stage queue is longer (seconds). Keep it below redis.jobs_ttl
+    max_wait: float = 600
+    # Tasks per second one consumer of the queue processes. Used when the
+    # queue isn't draining, so the actual rate can't be observed
+    consumer_throughput: float = 0.5
+    # Queue depth is checked at most once per interval (seconds)
+    check_interval: float = 5
+    max_retry_after: int = 300
+
+
+class CompressionConfig(BaseModel):
+    """Settings for gzip compression of responses"""
+
+    enabled: bool = True
+    # Responses smaller than this (in bytes) are sent as is
+    minimum_size: int = 4096
+    compress_level: int = 5
 
 
 class EmailSettings(BaseModel):
@@ -108,6 +240,17 @@ class EmailSettings(BaseModel):
     smtp_password: str
     smtp_start_tls: bool = False
     smtp_use_tls: bool = False
+    smtp_timeout: float = 30
+    # Emails are queued in Redis and sent by the email worker
+    # (python -m src.auth.email_worker) over persistent SMTP connections
+    smtp_connections: int = 2
+    outbox_batch_size: int = 50
+    # Failed emails are retried after retry_delay * 2^(attempt - 1) seconds
+    outbox_max_attempts: int = 5
+    outbox_retry_delay: float = 10
+    # Unique and stable name of the email worker instance. Emails it was
+    # sending when it stopped are recovered on its next start
+    outbox_worker_name: str = "default"
 
 
 class Settings(BaseSettings):
@@ -115,13 +258,22 @@ class Settings(BaseSettings):
     logging: LoggingConfig = LoggingConfig()
     db: DatabaseConfig
     run: RunConfig = RunConfig()
+    timing: TimingConfig = TimingConfig()
     api: ApiPrefix = ApiPrefix()
+    compression: CompressionConfig = CompressionConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
     auth: AuthJWTConfig = AuthJWTConfig()
+    user_cache: UserCacheConfig = UserCacheConfig()
+    password: PasswordHashingConfig = PasswordHashingConfig()
     style: StyleSettings = StyleSettings()
     email: EmailSettings
     tasks: TasksSettings = TasksSettings()
+    admission: AdmissionConfig = AdmissionConfig()
     rmq: BrokerConfig
     redis: RedisConfig
+    # Scrape endpoint of the tasks consumer, the API serves GET /metrics
+    metrics: MetricsConfig = MetricsConfig()
+    tracing: TracingConfig = TracingConfig()
     model_config = SettingsConfigDict(
         env_file=ENV_PATH,
         extra="ignore",
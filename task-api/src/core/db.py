@@ -1,6 +1,66 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import itertools
+import logging
+import os
+import time
 
-from src.core.config import settings
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from shared import get_timing
+
+from src.core.config import settings, API_WORKERS_ENV
+
+logger = logging.getLogger(__name__)
+
+# 0 if the replica replayed everything it received, otherwise the age of the
+# last replayed transaction (it grows on idle primary, so check LSNs first)
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+def _make_session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=engine,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+    )
+
+
+class Replica:
+    """Read replica with its replication lag, checked at most once per interval"""
+
+    def __init__(self, url: str, params: dict, check_interval: float):
+        self.engine = create_async_engine(url=url, **params)
+        self.session_factory = _make_session_factory(self.engine)
+        self.check_interval = check_interval
+        self.lag: float | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get_lag(self) -> float | None:
+        """Lag in seconds, None if the replica is unavailable"""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return self.lag
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.check_interval:
+                return self.lag
+            try:
+                async with self.engine.connect() as conn:
+                    self.lag = float(await conn.scalar(REPLICA_LAG_QUERY))
+            except Exception:
+                logger.warning("Failed to check replica lag", exc_info=True)
+                self.lag = None
+            self._checked_at = time.monotonic()
+        return self.lag
 
 
 class DatabaseHelper:
@@ -8,32 +68,74 @@ class DatabaseHelper:
         self,
         url: str,
         params: dict,
+        replica_urls: list[str] | None = None,
+        replica_max_lag: float = 1.0,
+        replica_check_interval: float = 5.0,
     ):
         self.engine = create_async_engine(
             url=url,
             **params,
         )
 
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False,
-        )
+        self.session_factory = _make_session_factory(self.engine)
+
+        self.replicas = [
+            Replica(replica_url, params, replica_check_interval)
+            for replica_url in replica_urls or []
+        ]
+        self.replica_max_lag = replica_max_lag
+        self._replicas_cycle = itertools.cycle(self.replicas)
+
+        for engine in (self.engine, *(replica.engine for replica in self.replicas)):
+            event.listen(
+                engine.sync_engine, "before_cursor_execute", self._before_execute
+            )
+            event.listen(
+                engine.sync_engine, "after_cursor_execute", self._after_execute
+            )
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @staticmethod
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        # Report query time to the request timing (Server-Timing header)
+        timing = get_timing()
+        if timing is not None:
+            timing.add("db", time.perf_counter() - context._query_start)
+
+    async def get_read_session_factory(self) -> async_sessionmaker:
+        """Session factory of the next replica that keeps up, primary otherwise"""
+        for _ in range(len(self.replicas)):
+            replica = next(self._replicas_cycle)
+            lag = await replica.get_lag()
+            if lag is not None and lag <= self.replica_max_lag:
+                return replica.session_factory
+        return self.session_factory
 
     async def dispose(self):
         await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
 
     async def session_getter(self):
         async with self.session_factory() as session:
             yield session
 
 
+# Every API worker process has its own pool, so split the connections between
+# them. Standalone processes keep the whole pool
+workers = int(os.environ.get(API_WORKERS_ENV, 1))
+
 db_helper = DatabaseHelper(
     url=str(settings.db.url),
     params={
         "echo": settings.db.echo,
-        "pool_size": settings.db.pool_size,
-        "max_overflow": settings.db.max_overflow,
+        "pool_size": max(1, settings.db.pool_size // workers),
+        "max_overflow": settings.db.max_overflow // workers,
     },
+    replica_urls=settings.db.replica_urls,
+    replica_max_lag=settings.db.replica_max_lag,
+    replica_check_interval=settings.db.replica_check_interval,
 )
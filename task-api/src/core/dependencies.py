@@ -4,9 +4,17 @@ from typing import Annotated
 from fastapi import Depends, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from shared import UnitOfWork, TasksRedisClient, JobsRedisClient
+from shared import (
+    UnitOfWork,
+    ReadOnlyUnitOfWork,
+    TasksRedisClient,
+    JobsRedisClient,
+    TaskListCacheRedisClient,
+    timing_span,
+)
 from src.auth.schemas import UserDTO
 from src.auth.utils import decode_jwt
+from src.auth.cache import user_cache
 from src.auth.service import AuthService
 from src.auth.repository import AuthRepository
 from src.auth.user_repository import UserRepository
@@ -19,6 +27,7 @@ from src.core.exceptions import (
     NoAccessError,
 )
 from src.core.redis import redis_client
+from src.tasks.admission import admission_controller
 from src.tasks.repository import TasksSQLAlchemyRepository
 from src.tasks.service import TasksService
 
@@ -34,6 +43,7 @@ def get_auth_service() -> AuthService:
         uow=uow,
         user_repository=user_repository,
         auth_repository=auth_repository,
+        user_cache=user_cache,
     )
 
 
@@ -41,7 +51,8 @@ def get_current_token_payload(
     credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
 ) -> dict:
     token = credentials.credentials
-    payload = decode_jwt(token)
+    with timing_span("jwt"):
+        payload = decode_jwt(token)
     exp = payload["exp"]
     if exp < datetime.now(UTC).timestamp():
         raise TokenExpiredError()
@@ -68,7 +79,8 @@ async def get_current_user(
     email = payload.get("sub")
     if not email:
         raise InvalidTokenError("No email in token")
-    user = await service.get_by_email(email)
+    with timing_span("auth"):
+        user = await service.get_by_email(email)
     return user
 
 
@@ -108,11 +120,18 @@ def get_task_service() -> TasksService:
     jobs_redis_cli = JobsRedisClient(settings.redis, redis_client.get_connection())
     sqla_repo = TasksSQLAlchemyRepository()
     uow = UnitOfWork(db_helper.session_factory)
+    read_uow = ReadOnlyUnitOfWork(db_helper.get_read_session_factory)
+    task_list_cache = TaskListCacheRedisClient(
+        settings.redis, redis_client.get_connection()
+    )
     return TasksService(
         tasks_redis_cli=redis_repo,
         jobs_redis_cli=jobs_redis_cli,
         sqla_repository=sqla_repo,
         uow=uow,
+        read_uow=read_uow,
+        task_list_cache=task_list_cache,
+        admission=admission_controller if settings.admission.enabled else None,
     )
 
 
@@ -41,7 +41,31 @@ class ConflictError(AppError):
     message = "Conflict"
 
 
-class EntityTooLargeError(AuthError):
+class InvalidCursorError(AppError):
+    message = "Invalid pagination cursor"
+
+
+class InvalidInputError(AppError):
+    message = "Invalid input data"
+
+
+class EntityTooLargeError(AppError):
     """413 status code error"""
 
     message = "Entity is too large"
+
+
+class TooManyRequestsError(AppError):
+    """429 status code error"""
+
+    message = "Too Many Requests"
+
+
+class ServiceUnavailableError(AppError):
+    """503 status code error"""
+
+    message = "Service temporarily unavailable"
+
+    def __init__(self, detail: str | None = None, retry_after: int | None = None):
+        super().__init__(detail)
+        self.retry_after = retry_after
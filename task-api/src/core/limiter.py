@@ -1,4 +1,144 @@
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+import logging
+import math
+import time
 
-limiter = Limiter(key_func=get_remote_address)
+from fastapi import Depends, Request, Response
+from limits import parse
+from limits.aio.storage import MemoryStorage
+from limits.aio.strategies import STRATEGIES
+from limits.storage import storage_from_string
+
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_or_ip(request: Request) -> str:
+    """Limit authenticated requests per user and anonymous ones per IP"""
+    # Imported here: src.auth views import this module
+    from src.auth.utils import decode_jwt
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_id = decode_jwt(token).get("user_id")
+        except Exception:
+            # Invalid tokens are rejected by auth, limit them by IP
+            user_id = None
+        if user_id:
+            return f"user:{user_id}"
+    client = request.client
+    return f"ip:{client.host if client else '127.0.0.1'}"
+
+
+class RateLimiter:
+    """
+    Adapter over the async API of `limits` used by the routes.
+
+    Counters are kept in Redis without blocking the event loop. While the
+    storage is unavailable the limits are counted per process, or not
+    applied if the in-memory fallback is disabled.
+    """
+
+    def __init__(
+        self,
+        storage_uri: str,
+        strategy: str,
+        key_prefix: str,
+        headers_enabled: bool = True,
+        in_memory_fallback: bool = True,
+        enabled: bool = True,
+    ):
+        # Async variant of the storage, e.g. async+redis://
+        if not storage_uri.startswith("async+"):
+            storage_uri = f"async+{storage_uri}"
+        storage = storage_from_string(
+            storage_uri, implementation="redispy", key_prefix=key_prefix
+        )
+        self.limiter = STRATEGIES[strategy](storage)
+        self.fallback = (
+            STRATEGIES[strategy](MemoryStorage()) if in_memory_fallback else None
+        )
+        self.headers_enabled = headers_enabled
+        self.enabled = enabled
+
+    async def _hit(self, limiter, item, key: str, scope: str, cost: int):
+        allowed = await limiter.hit(item, key, scope, cost=cost)
+        stats = None
+        if self.headers_enabled or not allowed:
+            stats = await limiter.get_window_stats(item, key, scope)
+        return allowed, stats
+
+    async def hit(
+        self,
+        request: Request,
+        response: Response,
+        limit_value: str,
+        scope: str,
+        cost: int = 1,
+    ):
+        """Consume `cost` hits of the limit, e.g. one hit per task of a batch"""
+        if not self.enabled:
+            return
+        item = parse(limit_value)
+        key = get_user_or_ip(request)
+        try:
+            allowed, stats = await self._hit(self.limiter, item, key, scope, cost)
+        except Exception:
+            logger.warning("Rate limit storage is unavailable", exc_info=True)
+            if self.fallback is None:
+                return
+            allowed, stats = await self._hit(self.fallback, item, key, scope, cost)
+
+        headers = {}
+        if stats is not None:
+            reset_in = max(math.ceil(stats.reset_time - time.time()), 0)
+            if self.headers_enabled:
+                headers = {
+                    "X-RateLimit-Limit": str(item.amount),
+                    "X-RateLimit-Remaining": str(max(stats.remaining, 0)),
+                    "X-RateLimit-Reset": str(math.ceil(stats.reset_time)),
+                }
+            if not allowed:
+                headers["Retry-After"] = str(max(reset_in, 1))
+        # Used by `inject_rate_limit_headers` for the 429 response
+        request.state.rate_limit_headers = headers
+        if not allowed:
+            raise TooManyRequestsError()
+        response.headers.update(headers)
+
+
+limiter = RateLimiter(
+    storage_uri=settings.rate_limit.storage_uri or settings.redis.url,
+    strategy=settings.rate_limit.strategy,
+    key_prefix=settings.rate_limit.key_prefix,
+    headers_enabled=settings.rate_limit.headers_enabled,
+    in_memory_fallback=settings.rate_limit.in_memory_fallback,
+    enabled=settings.rate_limit.enabled,
+)
+
+
+async def hit_limit(
+    request: Request,
+    response: Response,
+    limit_value: str,
+    scope: str,
+    cost: int = 1,
+):
+    await limiter.hit(request, response, limit_value, scope, cost)
+
+
+def rate_limit(limit_value: str, scope: str):
+    """Route dependency consuming one hit of the limit shared by the scope"""
+
+    async def dependency(request: Request, response: Response):
+        await limiter.hit(request, response, limit_value, scope)
+
+    return Depends(dependency)
+
+
+def inject_rate_limit_headers(request: Request, response: Response) -> Response:
+    """Add X-RateLimit-* and Retry-After headers to a 429 response"""
+    response.headers.update(getattr(request.state, "rate_limit_headers", {}))
+    return response
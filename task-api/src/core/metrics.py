@@ -0,0 +1,7 @@
+from shared import Histogram
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests, per route",
+    ["method", "route", "status"],
+)
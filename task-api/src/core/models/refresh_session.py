@@ -1,5 +1,6 @@
+from datetime import datetime
 from uuid import UUID
-from sqlalchemy import ForeignKey
+from sqlalchemy import DateTime, ForeignKey, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.core.models import Base
@@ -7,5 +8,7 @@ from src.core.models.mixins import UUIDPkMixin, TimestampMixin
 
 
 class RefreshSession(UUIDPkMixin, TimestampMixin, Base):
-    refresh_token: Mapped[str] = mapped_column(unique=True)
+    # SHA-256 of the refresh token, the token itself is not stored
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
@@ -2,7 +2,7 @@ import uuid
 from enum import Enum
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, relationship
 from sqlalchemy.testing.schema import mapped_column
 
@@ -23,6 +23,11 @@ class TaskFinishedStatus(str, Enum):
 class Task(UUIDPkMixin, TimestampMixin, Base):
     """Task model"""
 
+    __table_args__ = (
+        # Keyset pagination of user's tasks
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
     pdf_url: Mapped[str | None]
     user_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE")
@@ -0,0 +1,21 @@
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class PydanticJSONResponse(Response):
+    """
+    JSON response rendered directly by pydantic-core (or already rendered bytes).
+
+    Returning it from a view skips `response_model` re-validation and the
+    `jsonable_encoder` + `json.dumps` round trip, the model is dumped to
+    bytes in one call. `response_model` is still used for OpenAPI docs.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
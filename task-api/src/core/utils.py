@@ -1,4 +1,6 @@
+import asyncio
 from time import time
+from typing import Awaitable, Callable, Hashable, TypeVar
 
 from uuid_extensions import uuid7
 
@@ -14,3 +16,26 @@ def get_time(seconds_precision=True):
 def get_uuid():
     """Return a UUID7 as string"""
     return str(uuid7())
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one call.
+
+    The call runs in its own task, so a cancelled caller (e.g. disconnected
+    client) doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
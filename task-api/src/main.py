@@ -1,23 +1,36 @@
+import os
 from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from src.core.broker import rabbit
-from src.core.config import settings
+from src.core.config import settings, API_WORKERS_ENV
 from src.core.db import db_helper
 from src.core.redis import redis_client
-from src.middlewares import request_handler
+from src.middlewares import BodySizeLimitMiddleware, request_handler
 from src.routers import router
-from src.core.limiter import limiter
-from shared import configure_logging
+from src.tasks.events import task_events_hub
+from src.auth.sessions_purge import expired_sessions_purger
+from shared import (
+    configure_logging,
+    configure_tracing,
+    render_metrics,
+    prepare_multiprocess_dir,
+    METRICS_CONTENT_TYPE,
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    configure_tracing(settings.tracing)
     async with rabbit:
         # startup
+        expired_sessions_purger.start()
         yield
         # shutdown
+        await expired_sessions_purger.close()
+        await task_events_hub.close()
         await db_helper.dispose()
         await redis_client.close()
 
@@ -27,18 +40,50 @@ app = FastAPI(
     version=settings.docs.version,
     lifespan=lifespan,
 )
+# Inside request_handler, so rejected requests are logged and measured
+tasks_prefix = settings.api.prefix + settings.api.tasks
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        tasks_prefix: settings.tasks.max_request_size,
+        f"{tasks_prefix}/batch": settings.tasks.max_batch_request_size,
+        f"{tasks_prefix}/markdown": settings.tasks.max_input_size,
+    },
+)
 app.middleware("http")(request_handler)
+if settings.compression.enabled:
+    # Large task lists compress well
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=settings.compression.minimum_size,
+        compresslevel=settings.compression.compress_level,
+    )
 
 app.include_router(router)
-app.state.limiter = limiter
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint (metrics of all worker processes)"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 
 if __name__ == "__main__":
     configure_logging()
     """Run the API using Uvicorn"""
+    # Inherited by the worker processes, they split the DB pool
+    os.environ[API_WORKERS_ENV] = str(settings.run.workers_count)
+    if settings.run.workers_count > 1:
+        # Workers write metrics to files, GET /metrics of any worker merges them
+        prepare_multiprocess_dir()
     uvicorn.run(
         "src.main:app",
         host=settings.run.host,
         port=settings.run.port,
-        reload=settings.run.reload,
+        reload=settings.run.reload and not settings.run.production,
+        workers=settings.run.workers_count,
+        loop=settings.run.loop,
+        http=settings.run.http,
+        # Requests are already logged by request_handler
+        access_log=not settings.run.production,
     )
@@ -1,6 +1,10 @@
 import logging
+import random
+import secrets
+
 from fastapi import Request, Response, HTTPException
-from slowapi.errors import RateLimitExceeded
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.core.exceptions import (
     AppError,
@@ -9,13 +13,28 @@ from src.core.exceptions import (
     ForbiddenError,
     AuthError,
     EntityTooLargeError,
+    ServiceUnavailableError,
+    TooManyRequestsError,
 )
+from .core.config import settings
+from .core.limiter import inject_rate_limit_headers
+from .core.metrics import HTTP_REQUEST_SECONDS
 from .core.utils import get_time, get_uuid
 from fastapi.responses import JSONResponse
+from shared import start_timing
 
 logger = logging.getLogger(__name__)
 
 
+def is_debug_request(request: Request) -> bool:
+    """Check if the request may see internal timings"""
+    token = settings.timing.debug_token
+    header = request.headers.get("X-Debug-Token")
+    if not token or not header:
+        return False
+    return secrets.compare_digest(header.encode(), token.encode())
+
+
 async def request_handler(request: Request, call_next):
     """Middleware used by FastAPI to process each request, featuring:
 
@@ -30,18 +49,20 @@ async def request_handler(request: Request, call_next):
     adapter.debug(
         "Request started", extra={"url": str(request.url), "method": request.method}
     )
+    timing = None
+    debug_request = is_debug_request(request)
+    if debug_request or (
+        settings.timing.enabled and random.random() < settings.timing.sample_rate
+    ):
+        timing = start_timing()
 
     try:
         response: Response = await call_next(request)
 
     except AppError as exc:
         response = ErrorProcessor.process_app_exception(exc)
-
-    except RateLimitExceeded:
-        response = JSONResponse(
-            status_code=429,
-            content={"detail": "Too Many Requests"},
-        )
+        if isinstance(exc, TooManyRequestsError):
+            response = inject_rate_limit_headers(request, response)
 
     except HTTPException as exc:
         response = ErrorProcessor.process_http_exception(exc)
@@ -53,8 +74,29 @@ async def request_handler(request: Request, call_next):
             content={"detail": "Internal Server Error"},
         )
 
+    if timing:
+        if debug_request or settings.timing.expose_header:
+            response.headers["Server-Timing"] = timing.server_timing()
+        adapter.info(
+            "Request timing",
+            extra={
+                "url": request.url.path,
+                "method": request.method,
+                "response_status": response.status_code,
+                "time_elapsed": round(timing.elapsed(), 5),
+                "spans": timing.as_dict(),
+            },
+        )
+
     end_time = get_time(seconds_precision=False)
     time_elapsed = round(end_time - start_time, 5)
+    # Route template (e.g. /api/tasks/{task_id}) keeps the number of series bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=getattr(response, "status_code", 500),
+    ).observe(end_time - start_time)
     adapter.debug(
         "Request ended",
         extra={
@@ -65,6 +107,59 @@ async def request_handler(request: Request, call_next):
     return response
 
 
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies larger than the limit of the path before they are parsed.
+
+    Limits are matched by the longest path prefix. Requests with a larger
+    Content-Length are rejected without reading the body, chunked bodies
+    are counted while the app reads them.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]):
+        self.app = app
+        # Longest prefixes first
+        self.limits = sorted(
+            limits.items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def _get_limit(self, path: str) -> int | None:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return None
+
+    @staticmethod
+    def _too_large(limit: int) -> HTTPException:
+        return HTTPException(
+            status_code=413, detail=f"Request body too large. Max size: {limit} bytes"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = self._get_limit(scope["path"])
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            raise self._too_large(limit)
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise self._too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
 class ErrorProcessor:
     @classmethod
     def log_exception(cls, exc: Exception, status_code: int) -> None:
@@ -91,13 +186,22 @@ class ErrorProcessor:
             status_code = 401
         elif isinstance(exc, EntityTooLargeError):
             status_code = 413
+        elif isinstance(exc, TooManyRequestsError):
+            status_code = 429
+        elif isinstance(exc, ServiceUnavailableError):
+            status_code = 503
         else:
             status_code = 400
 
+        headers = None
+        if isinstance(exc, ServiceUnavailableError) and exc.retry_after:
+            headers = {"Retry-After": str(exc.retry_after)}
+
         cls.log_exception(exc, status_code)
         return JSONResponse(
             status_code=status_code,
             content={"detail": exc.detail},
+            headers=headers,
         )
 
     @classmethod
@@ -8,12 +8,16 @@ from shared import (
     AbstractRabbitConsumer,
     TaskMessage,
     TasksRedisClient,
+    IdempotencyRedisClient,
+    TaskListCacheRedisClient,
     configure_logging,
     UnitOfWork,
     TaskSchema,
     StatusEnum,
     TopologyConfig,
     setup_rabbitmq_topology,
+    start_metrics_server,
+    configure_tracing,
 )
 from src.tasks.repository import TasksSQLAlchemyRepository
 
@@ -31,6 +35,8 @@ logger = logging.getLogger(__name__)
 
 
 class TaskFinishedConsumer(AbstractRabbitConsumer):
+    stage = "task_finished"
+
     def __init__(
         self,
         tasks_redis_cli: TasksRedisClient,
@@ -40,32 +46,54 @@ class TaskFinishedConsumer(AbstractRabbitConsumer):
         port: int = 5672,
         login: str = "guest",
         password: str = "guest",
+        idempotency_redis_cli: IdempotencyRedisClient | None = None,
+        task_list_cache: TaskListCacheRedisClient | None = None,
+        dlx: str | None = None,
+        delay_queue: str | None = None,
     ):
-        super().__init__(host, port, login, password)
+        super().__init__(
+            host,
+            port,
+            login,
+            password,
+            dlx=dlx,
+            idempotency_redis_cli=idempotency_redis_cli,
+            delay_queue=delay_queue,
+        )
         self.tasks_redis_cli = tasks_redis_cli
         self.uow = uow
         self.repository = repository
+        self.task_list_cache = task_list_cache
 
     async def process_message(self, message: "AbstractIncomingMessage"):
+        task_msg = None
         try:
             # deserialize message
             task_msg = TaskMessage.model_validate(
                 json.loads(message.body.decode(encoding="utf-8"))
             )
 
+            # Skip duplicate deliveries before touching the DB
+            if not await self.claim_task(task_msg.id, message):
+                return
+
             # get data from redis
             task = await self.tasks_redis_cli.get_task(task_msg.id)
 
             # Ignore request if data in Redis not exists
             if not task:
                 logger.warning(f"Task #{task_msg.id} has no Task in Redis. Skipping.")
+                await self.release_task(task_msg.id)
                 return
             logger.debug(f"Received task #{task.id}")
             await self._process_task_finished(task)
             logger.debug(f"Processed task: Task #{task.id}")
-            await message.ack()
+            await self.complete_task(task_msg.id)
+            await self.ack(message)
         except Exception as e:
-            await message.nack(requeue=False)
+            await self.nack(message)
+            if task_msg:
+                await self.release_task(task_msg.id)
             logger.exception(f"Error processing message")
 
     def _prepare_data_to_create(self, result: TaskSchema):
@@ -81,11 +109,17 @@ class TaskFinishedConsumer(AbstractRabbitConsumer):
     async def _process_task_finished(self, result: TaskSchema):
         async with self.uow as uow:
             try:
-                await self.repository.save(uow.session, self._prepare_data_to_create(result))
+                await self.repository.save(
+                    uow.session, self._prepare_data_to_create(result)
+                )
                 await uow.commit()
             except IntegrityError as e:
                 # Task already processed
                 logger.warning(f"Task with id {result.id} already exists in db: {e}")
+        # New task appears in the user's list (also on redelivery, in case
+        # the previous attempt failed before invalidating)
+        if self.task_list_cache is not None:
+            await self.task_list_cache.invalidate(result.user_id)
 
 
 async def main():
@@ -97,6 +131,11 @@ async def main():
         queue_name=settings.rmq.consumer_queue,
         exchange_name=settings.rmq.exchange,
         dlx_name=settings.rmq.dlx,
+        queue_type=settings.rmq.queue_type,
+        delivery_limit=settings.rmq.delivery_limit,
+        max_length=settings.rmq.max_length,
+        overflow=settings.rmq.overflow,
+        legacy_queue=settings.rmq.legacy_consumer_queue,
     )
     await setup_rabbitmq_topology(
         topology_config,
@@ -106,9 +145,19 @@ async def main():
         password=settings.rmq.password,
     )
 
+    configure_tracing(settings.tracing)
+    if settings.metrics.enabled:
+        start_metrics_server(settings.metrics.host, settings.metrics.port)
+
     uow = UnitOfWork(db_helper.session_factory)
     repository = TasksSQLAlchemyRepository()
     redis_client = TasksRedisClient(settings.redis)
+    idempotency_redis_cli = IdempotencyRedisClient(
+        settings.redis, redis_client.get_connection()
+    )
+    task_list_cache = TaskListCacheRedisClient(
+        settings.redis, redis_client.get_connection()
+    )
 
     async with TaskFinishedConsumer(
         tasks_redis_cli=redis_client,
@@ -118,9 +167,15 @@ async def main():
         port=settings.rmq.port,
         login=settings.rmq.user,
         password=settings.rmq.password,
+        dlx=settings.rmq.dlx,
+        delay_queue=topology_config.delay_queue,
+        idempotency_redis_cli=idempotency_redis_cli,
+        task_list_cache=task_list_cache,
     ) as consumer:
         logger.info(f"Starting consumer for queue: {settings.rmq.consumer_queue}")
-        await consumer.start_consuming(settings.rmq.consumer_queue)
+        await consumer.start_consuming(
+            settings.rmq.consumer_queue, settings.rmq.legacy_consumer_queue
+        )
 
 
 if __name__ == "__main__":
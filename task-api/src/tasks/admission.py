@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import math
+import time
+
+from shared import RabbitPublisher
+from src.core.broker import rabbit
+from src.core.config import settings
+from src.core.exceptions import ServiceUnavailableError
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """
+    Admits new tasks while the first stage queue can take them in time.
+
+    The wait of a new task is the number of ready messages divided by the
+    processing rate. The rate is the larger of the configured throughput of
+    the queue consumers and the observed drain rate of the queue. Tasks
+    waiting longer than `max_wait` would outlive their Redis jobs, so they
+    are rejected with 503 instead.
+    """
+
+    def __init__(
+        self,
+        broker: RabbitPublisher,
+        queue_name: str,
+        max_wait: float,
+        consumer_throughput: float,
+        check_interval: float,
+        max_retry_after: int,
+    ):
+        self.broker = broker
+        self.queue_name = queue_name
+        self.max_wait = max_wait
+        self.consumer_throughput = consumer_throughput
+        self.check_interval = check_interval
+        self.max_retry_after = max_retry_after
+        self.depth: int | None = None
+        self.rate = consumer_throughput
+        self._drain_rate = 0.0
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _check(self):
+        try:
+            depth, consumers = await self.broker.queue_stats(self.queue_name)
+        except Exception:
+            logger.warning("Failed to check queue depth", exc_info=True)
+            self.depth = None
+            self._checked_at = time.monotonic()
+            return
+
+        now = time.monotonic()
+        if self.depth is not None and depth < self.depth:
+            drained = (self.depth - depth) / (now - self._checked_at)
+            self._drain_rate = (self._drain_rate + drained) / 2
+        else:
+            # Not draining, the old observation gets less relevant
+            self._drain_rate /= 2
+        # A queue without consumers may be waiting for a restarting worker
+        self.rate = max(max(consumers, 1) * self.consumer_throughput, self._drain_rate)
+        self.depth = depth
+        self._checked_at = now
+
+    async def estimate_wait(self, count: int = 1) -> float | None:
+        """Seconds until `count` new tasks are processed, None if unknown"""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            async with self._lock:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    await self._check()
+        if self.depth is None:
+            return None
+        return (self.depth + count) / self.rate
+
+    async def admit(self, count: int = 1) -> float | None:
+        """Estimated wait of the tasks, raises 503 if the queue is backed up"""
+        wait = await self.estimate_wait(count)
+        if wait is not None and wait > self.max_wait:
+            # Time for the queue to drain back to the budget
+            retry_after = min(math.ceil(wait - self.max_wait), self.max_retry_after)
+            raise ServiceUnavailableError(
+                "Too many tasks in the queue, try again later",
+                retry_after=max(retry_after, 1),
+            )
+        return wait
+
+
+admission_controller = AdmissionController(
+    rabbit,
+    queue_name=settings.rmq.producer_queue,
+    max_wait=settings.admission.max_wait,
+    consumer_throughput=settings.admission.consumer_throughput,
+    check_interval=settings.admission.check_interval,
+    max_retry_after=settings.admission.max_retry_after,
+)
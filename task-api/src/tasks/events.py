@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from uuid import UUID
+
+from redis.asyncio import Redis
+
+from shared import TaskEvent, TasksRedisClient
+from src.core.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class TaskEventsHub:
+    """
+    Fan-out of task events from Redis pub/sub to local subscribers.
+
+    The process holds a single subscription to the events channel and
+    dispatches events to the queues of the clients waiting for that task.
+    If the subscription is lost, subscribers get None (events may have been
+    missed) and the next subscriber starts a new listener.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._subscribers: dict[str, set[asyncio.Queue[TaskEvent | None]]] = (
+            defaultdict(set)
+        )
+        self._listener: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_listener(self):
+        async with self._lock:
+            if self._listener and not self._listener.done():
+                return
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(TasksRedisClient.EVENTS_CHANNEL)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                try:
+                    event = TaskEvent.model_validate_json(message["data"])
+                except ValueError:
+                    logger.warning("Invalid task event: %s", message["data"])
+                    continue
+                for queue in self._subscribers.get(str(event.id), ()):
+                    queue.put_nowait(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Task events listener stopped")
+        finally:
+            try:
+                await pubsub.aclose()
+            finally:
+                # Subscribers may have missed events
+                for queues in self._subscribers.values():
+                    for queue in queues:
+                        queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def subscribe(
+        self, task_id: UUID
+    ) -> AsyncIterator[asyncio.Queue[TaskEvent | None]]:
+        """Receive events of the task while inside the context"""
+        await self._ensure_listener()
+        key = str(task_id)
+        queue: asyncio.Queue[TaskEvent | None] = asyncio.Queue()
+        self._subscribers[key].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[key].discard(queue)
+            if not self._subscribers[key]:
+                del self._subscribers[key]
+
+    async def close(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+
+
+task_events_hub = TaskEventsHub(redis_client.get_connection())
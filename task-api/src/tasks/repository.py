@@ -1,6 +1,8 @@
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, tuple_, any_, bindparam, Uuid
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.models import Task
@@ -15,8 +17,31 @@ class TasksSQLAlchemyRepository:
     async def get_by_id(self, session: AsyncSession, id: UUID) -> Task | None:
         return await session.get(Task, id)
 
-    async def get_by_user_id(self, session: AsyncSession, user_id: UUID) -> list[Task]:
-        result = await session.scalars(select(Task).where(Task.user_id == user_id))
+    async def get_by_ids(self, session: AsyncSession, ids: list[UUID]) -> list[Task]:
+        # `= ANY(:ids)` keeps a single statement shape for any number of ids
+        stmt = select(Task).where(
+            Task.id == any_(bindparam("ids", ids, type_=ARRAY(Uuid)))
+        )
+        result = await session.scalars(stmt)
+        return list(result.all())
+
+    async def get_by_user_id(
+        self,
+        session: AsyncSession,
+        user_id: UUID,
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> list[Task]:
+        """Get user's tasks, newest first, starting after (created_at, id)"""
+        stmt = (
+            select(Task)
+            .where(Task.user_id == user_id)
+            .order_by(Task.created_at.desc(), Task.id.desc())
+            .limit(limit)
+        )
+        if after:
+            stmt = stmt.where(tuple_(Task.created_at, Task.id) < tuple_(*after))
+        result = await session.scalars(stmt)
         return list(result.all())
 
     async def delete(self, session: AsyncSession, id: UUID) -> None:
@@ -1,9 +1,72 @@
-from pydantic import BaseModel
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel, Field, ValidationError
+
+from shared import TaskSchema
+from src.core.config import settings
+from src.core.exceptions import InvalidCursorError
 
 
 class CreateTaskRequest(BaseModel):
     data: str
 
 
+class CreateTasksBatchRequest(BaseModel):
+    items: list[CreateTaskRequest] = Field(
+        min_length=1, max_length=settings.tasks.max_batch_size
+    )
+
+
+class TaskBatchItem(BaseModel):
+    # Position of the item in the request
+    index: int
+    task: TaskSchema | None = None
+    error: str | None = None
+
+
+class TaskCreatedResponse(TaskSchema):
+    # Estimated time the first processing stage finishes the task,
+    # None if the queue state is unknown
+    eta: datetime | None = None
+
+
+class TasksBatchResponse(BaseModel):
+    items: list[TaskBatchItem]
+    eta: datetime | None = None
+
+
+class TasksStatusResponse(BaseModel):
+    items: list[TaskSchema]
+    # Requested ids that don't exist (or already deleted)
+    not_found: list[UUID]
+
+
 class StylesResponse(BaseModel):
     styles: list[str]
+
+
+class TasksCursor(BaseModel):
+    """Position in the user's task list: (created_at, id) of the last task"""
+
+    created_at: datetime
+    id: UUID
+
+    def encode(self) -> str:
+        raw = f"{self.created_at.isoformat()}|{self.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @classmethod
+    def decode(cls, cursor: str) -> "TasksCursor":
+        try:
+            created_at, id = base64.urlsafe_b64decode(cursor).decode().split("|")
+            return cls(created_at=created_at, id=id)
+        except (ValueError, ValidationError):
+            raise InvalidCursorError()
+
+
+class TasksPage(BaseModel):
+    items: list[TaskSchema]
+    # Pass as `cursor` to get the next page, None on the last page
+    next_cursor: str | None = None
@@ -1,17 +1,42 @@
+import asyncio
 import json
 import logging
+from datetime import datetime, UTC, timedelta
+from typing import AsyncIterator
 from uuid import UUID
-from shared import UnitOfWork, Job, JobStage
-from shared import TaskMessage, TaskSchema, StatusEnum
-from src.core.exceptions import NotFoundError, ForbiddenError, EntityTooLargeError
+from pydantic import TypeAdapter
+from shared import UnitOfWork, ReadOnlyUnitOfWork, Job, JobStage
+from shared import TaskMessage, TaskSchema, TaskEvent, StatusEnum
+from src.core.exceptions import (
+    NotFoundError,
+    ForbiddenError,
+    EntityTooLargeError,
+    ServiceUnavailableError,
+)
 from src.tasks.repository import TasksSQLAlchemyRepository
-from shared import JobsRedisClient, TasksRedisClient
+from src.tasks.schemas import (
+    TasksCursor,
+    TasksPage,
+    TaskBatchItem,
+    TaskCreatedResponse,
+    TasksStatusResponse,
+)
+from src.tasks.admission import AdmissionController
+from shared import JobsRedisClient, TasksRedisClient, TaskListCacheRedisClient, tracer
+from redis.exceptions import RedisError
 from uuid_extensions import uuid7
 from src.core.broker import rabbit
 from src.core.config import settings
+from src.core.utils import SingleFlight
+from src.tasks.events import task_events_hub
 
 logger = logging.getLogger(__name__)
 
+# Concurrent DB lookups of the same task in this process share one query
+task_lookups = SingleFlight()
+
+tasks_list_adapter = TypeAdapter(list[TaskSchema])
+
 
 class TasksService:
     def __init__(
@@ -20,19 +45,45 @@ class TasksService:
         tasks_redis_cli: TasksRedisClient,
         sqla_repository: TasksSQLAlchemyRepository,
         uow: UnitOfWork,
+        read_uow: ReadOnlyUnitOfWork | None = None,
+        task_list_cache: TaskListCacheRedisClient | None = None,
+        admission: AdmissionController | None = None,
     ):
         self.tasks_redis_cli = tasks_redis_cli
         self.jobs_redis_cli = jobs_redis_cli
         self.sqla_repository = sqla_repository
         self.uow = uow
+        # Read-only queries may go to a replica. Tasks are saved to DB while
+        # they are still in Redis, so replica lag doesn't hide fresh tasks
+        self.read_uow = read_uow or uow
+        self.task_list_cache = task_list_cache
+        self.admission = admission
 
-    async def create_task(self, data: str, user_id: UUID) -> TaskSchema:
-        # Validate input data size
-        if len(data.encode("utf-8")) > settings.tasks.max_input_size:
+    @staticmethod
+    def _validate_input_size(data: str):
+        max_size = settings.tasks.max_input_size
+        # UTF-8 takes 1 to 4 bytes per character, encode only if it matters
+        if len(data) * 4 <= max_size:
+            return
+        if len(data) > max_size or len(data.encode("utf-8")) > max_size:
             raise EntityTooLargeError(
                 f"Input data too large. Max size: {settings.tasks.max_input_size} bytes"
             )
 
+    async def _admit(self, count: int) -> datetime | None:
+        """Reject new tasks if the queue is backed up, return their ETA"""
+        if self.admission is None:
+            return None
+        wait = await self.admission.admit(count)
+        if wait is None:
+            return None
+        return datetime.now(UTC) + timedelta(seconds=wait)
+
+    @staticmethod
+    def _build_task(
+        data: str, user_id: UUID
+    ) -> tuple[TaskSchema, Job | None, TaskMessage]:
+        """Build task, job and broker message. Job is None if data is inline"""
         # Generate task id
         task_id = uuid7()
         task = TaskSchema(
@@ -41,6 +92,11 @@ class TasksService:
             pdf_url="",
             user_id=user_id,
         )
+
+        # Small documents travel inside the message, large ones via Redis
+        if settings.rmq.fits_inline(data):
+            return task, None, TaskMessage(id=str(task_id), payload=data)
+
         job = Job(
             id=task_id,
             stage=JobStage.INPUT,
@@ -49,78 +105,306 @@ class TasksService:
             result_pdf_url="",
             error="",
         )
+        return task, job, TaskMessage(id=str(task_id))
 
-        try:
-            # put a task to redis
-            await self.tasks_redis_cli.create_task(task)
+    async def create_task(self, data: str, user_id: UUID) -> TaskCreatedResponse:
+        # Validate input data size
+        self._validate_input_size(data)
+        eta = await self._admit(1)
 
-            # create job record in redis
-            await self.jobs_redis_cli.put_job(job)
+        task, job, msg = self._build_task(data, user_id)
 
-            # create broker message
-            msg = TaskMessage(id=str(task_id))
+        # Start of the trace continued by the workers
+        with tracer.span("api", task_id=str(task.id)):
+            try:
+                # put a task to redis
+                await self.tasks_redis_cli.create_task(task)
 
-            # publish a message in broker
-            logger.debug("Publishing message: %s", msg)
-            await rabbit.publish_message(
-                settings.rmq.producer_queue,
-                settings.rmq.exchange,
-                json.dumps(msg.model_dump()).encode(),
-            )
-            logger.debug(
-                "Published message: %s. Exchange: %s, queue: %s",
-                msg,
-                settings.rmq.producer_queue,
-                settings.rmq.exchange,
-            )
-        except Exception:
-            # rollback in case of error
-            await self.tasks_redis_cli.delete_task(task_id)
-            await self.jobs_redis_cli.delete_job(task_id)
-            raise
-        return task
+                # create job record in redis
+                if job:
+                    await self.jobs_redis_cli.put_job(job)
 
-    async def _get_task_from_db(self, task_id: UUID) -> TaskSchema:
-        async with self.uow as uow:
-            task = await self.sqla_repository.get_by_id(uow.session, task_id)
-            if not task:
-                raise NotFoundError(f"Task with id {task_id} not found")
+                # publish a message in broker
+                logger.debug("Publishing message for task %s", msg.id)
+                await rabbit.publish_message(
+                    settings.rmq.producer_queue,
+                    settings.rmq.exchange,
+                    json.dumps(msg.model_dump()).encode(),
+                )
+                logger.debug(
+                    "Published message for task %s. Exchange: %s, queue: %s",
+                    msg.id,
+                    settings.rmq.producer_queue,
+                    settings.rmq.exchange,
+                )
+            except Exception:
+                # rollback in case of error
+                await self.tasks_redis_cli.delete_task(task.id)
+                await self.jobs_redis_cli.delete_job(task.id)
+                raise
+        return TaskCreatedResponse.model_construct(**dict(task), eta=eta)
 
-            return TaskSchema(
-                status=StatusEnum.READY,
-                id=task.id,
-                pdf_url=task.pdf_url,
-                user_id=task.user_id,
-            )
+    async def _delete_from_redis(self, task_ids: list[UUID]):
+        async with self.tasks_redis_cli.pipeline() as pipe:
+            for task_id in task_ids:
+                self.tasks_redis_cli.queue_delete_task(pipe, task_id)
+                self.jobs_redis_cli.queue_delete_job(pipe, task_id)
+            await pipe.execute()
+
+    async def create_tasks(
+        self, items: list[str], user_id: UUID
+    ) -> tuple[list[TaskBatchItem], datetime | None]:
+        """
+        Create tasks in bulk.
+
+        Items are validated up front, task and job hashes of all valid items
+        are written in one Redis pipeline and messages are published with
+        concurrent publisher confirms. Invalid or failed items get an error,
+        the request fails if no task was created.
+        Returns the items and ETA of the batch.
+        """
+        eta = await self._admit(len(items))
+        results = [TaskBatchItem(index=index) for index in range(len(items))]
+        accepted: list[tuple[int, TaskSchema, TaskMessage]] = []
+        async with self.tasks_redis_cli.pipeline() as pipe:
+            for index, data in enumerate(items):
+                try:
+                    self._validate_input_size(data)
+                except EntityTooLargeError as e:
+                    results[index].error = e.detail
+                    continue
+                task, job, msg = self._build_task(data, user_id)
+                self.tasks_redis_cli.queue_create_task(pipe, task)
+                if job:
+                    self.jobs_redis_cli.queue_put_job(pipe, job)
+                accepted.append((index, task, msg))
+            try:
+                await pipe.execute()
+            except Exception:
+                await self._delete_from_redis([task.id for _, task, _ in accepted])
+                raise
+        if not accepted:
+            # Size is the only per-item check
+            raise EntityTooLargeError(results[0].error)
+
+        publish_results = await rabbit.publish_messages(
+            settings.rmq.producer_queue,
+            settings.rmq.exchange,
+            [json.dumps(msg.model_dump()).encode() for _, _, msg in accepted],
+        )
+
+        failed = []
+        for (index, task, _), error in zip(accepted, publish_results):
+            if error:
+                logger.warning("Failed to publish task %s: %s", task.id, error)
+                results[index].error = "Failed to submit task"
+                failed.append(task.id)
+            else:
+                results[index].task = task
+        if failed:
+            # rollback tasks that were not published
+            await self._delete_from_redis(failed)
+        if len(failed) == len(accepted):
+            raise ServiceUnavailableError("Failed to submit tasks")
+        return results, eta
+
+    async def _get_task_from_db(self, task_id: UUID) -> TaskSchema | None:
+        """Load task from DB and copy it to Redis, or remember it doesn't exist"""
+        async with self.read_uow as uow:
+            row = await self.sqla_repository.get_by_id(uow.session, task_id)
+            task = None
+            if row:
+                task = TaskSchema(
+                    status=StatusEnum.READY,
+                    id=row.id,
+                    pdf_url=row.pdf_url,
+                    user_id=row.user_id,
+                )
+        try:
+            if task:
+                await self.tasks_redis_cli.cache_task(task)
+            else:
+                await self.tasks_redis_cli.mark_task_missing(task_id)
+        except RedisError:
+            logger.warning("Failed to cache task %s", task_id, exc_info=True)
+        return task
 
     async def get_task(
         self, task_id: UUID, user_id: UUID, is_superuser: bool = False
     ) -> TaskSchema:
         # Try to find task in Redis
-        task = await self.tasks_redis_cli.get_task(task_id)
+        task, missing = await self.tasks_redis_cli.lookup_task(task_id)
+        if missing:
+            raise NotFoundError(f"Task with id {task_id} not found")
 
         # If not found in Redis, try get from DB with ownership check
         if not task:
-            task = await self._get_task_from_db(task_id)
+            task = await task_lookups.do(
+                task_id, lambda: self._get_task_from_db(task_id)
+            )
+            if not task:
+                raise NotFoundError(f"Task with id {task_id} not found")
 
         # Check access
         if not (is_superuser or task.user_id == user_id):
             raise ForbiddenError("Access denied to this task")
         return task
 
-    async def get_user_tasks(self, user_id: UUID) -> list[TaskSchema]:
-        """Get all user`s tasks from DB"""
-        async with self.uow as uow:
-            tasks = await self.sqla_repository.get_by_user_id(uow.session, user_id)
-            return [
-                TaskSchema(
+    async def get_tasks_status(
+        self, task_ids: list[UUID], user_id: UUID, is_superuser: bool = False
+    ) -> TasksStatusResponse:
+        """Get several tasks: one Redis pipeline, then one DB query for misses"""
+        task_ids = list(dict.fromkeys(task_ids))
+        tasks = await self.tasks_redis_cli.get_tasks(task_ids)
+
+        missing = [task_id for task_id in task_ids if task_id not in tasks]
+        if missing:
+            async with self.read_uow as uow:
+                rows = await self.sqla_repository.get_by_ids(uow.session, missing)
+            for row in rows:
+                tasks[row.id] = TaskSchema.model_construct(
+                    status=StatusEnum.READY,
+                    id=row.id,
+                    pdf_url=row.pdf_url,
+                    user_id=row.user_id,
+                )
+
+        # Check access
+        if not is_superuser and any(task.user_id != user_id for task in tasks.values()):
+            raise ForbiddenError("Access denied to some of the tasks")
+
+        return TasksStatusResponse.model_construct(
+            items=[tasks[task_id] for task_id in task_ids if task_id in tasks],
+            not_found=[task_id for task_id in task_ids if task_id not in tasks],
+        )
+
+    async def wait_task_update(self, task: TaskSchema, timeout: float) -> TaskSchema:
+        """Long-poll: return the task after its next transition or on timeout"""
+        if task.status != StatusEnum.PROCESSING:
+            return task
+        async with task_events_hub.subscribe(task.id) as events:
+            # Task could be finished before we subscribed
+            current = await self.tasks_redis_cli.get_task(task.id) or task
+            if current.status != StatusEnum.PROCESSING:
+                return current
+            try:
+                event = await asyncio.wait_for(events.get(), timeout)
+            except TimeoutError:
+                return current
+            if event is None:
+                # Subscription lost, the update may have been missed
+                return await self.tasks_redis_cli.get_task(task.id) or current
+            return current.model_copy(
+                update={"status": event.status, "pdf_url": event.pdf_url}
+            )
+
+    async def iter_task_events(self, task: TaskSchema) -> AsyncIterator[str]:
+        """Stream task transitions as Server-Sent Events until task is finished"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.tasks.events_timeout
+        async with task_events_hub.subscribe(task.id) as events:
+            # Send current state first, task could change before we subscribed
+            current = await self.tasks_redis_cli.get_task(task.id) or task
+            event = TaskEvent(
+                id=current.id, status=current.status, pdf_url=current.pdf_url
+            )
+            yield f"data: {event.model_dump_json()}\n\n"
+
+            while event.status == StatusEnum.PROCESSING and loop.time() < deadline:
+                try:
+                    event = await asyncio.wait_for(
+                        events.get(), settings.tasks.events_keepalive
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Subscription lost, the client reconnects and gets the
+                    # current state
+                    break
+                yield f"data: {event.model_dump_json()}\n\n"
+
+    async def get_user_tasks(
+        self, user_id: UUID, limit: int, cursor: str | None = None
+    ) -> TasksPage:
+        """Get a page of user`s tasks from DB"""
+        after = None
+        if cursor:
+            position = TasksCursor.decode(cursor)
+            after = (position.created_at, position.id)
+        return await self._load_user_tasks(self.read_uow, user_id, limit, after)
+
+    async def get_user_tasks_json(
+        self, user_id: UUID, limit: int, cursor: str | None = None
+    ) -> tuple[bytes, str | None]:
+        """
+        Get a page of user`s tasks as a JSON list and the cursor of the next
+        page. The first page is cached in Redis
+        """
+        if cursor or self.task_list_cache is None:
+            page = await self.get_user_tasks(user_id, limit, cursor)
+            return tasks_list_adapter.dump_json(page.items), page.next_cursor
+
+        try:
+            cached, version = await self.task_list_cache.get_page(user_id, limit)
+        except RedisError:
+            logger.warning("Failed to read task list from cache", exc_info=True)
+            cached, version = None, None
+        if cached is not None:
+            data, next_cursor = cached
+            return data.encode(), next_cursor
+
+        # Cache is filled from primary, so a lagging replica can't be cached
+        page = await self._load_user_tasks(self.uow, user_id, limit)
+        data = tasks_list_adapter.dump_json(page.items)
+        if version is not None:
+            try:
+                await self.task_list_cache.set_page(
+                    user_id, limit, version, data.decode(), page.next_cursor
+                )
+            except RedisError:
+                logger.warning("Failed to write task list to cache", exc_info=True)
+        return data, page.next_cursor
+
+    async def invalidate_user_tasks(self, user_id: UUID):
+        if self.task_list_cache is None:
+            return
+        try:
+            await self.task_list_cache.invalidate(user_id)
+        except RedisError:
+            logger.warning("Failed to invalidate task list cache", exc_info=True)
+
+    async def _load_user_tasks(
+        self,
+        uow: UnitOfWork,
+        user_id: UUID,
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+    ) -> TasksPage:
+        async with uow as uow:
+            # Fetch one extra row to know if there is a next page
+            tasks = await self.sqla_repository.get_by_user_id(
+                uow.session, user_id, limit + 1, after
+            )
+
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = TasksCursor(created_at=last.created_at, id=last.id).encode()
+        # Rows come from DB, so skip validation of every item
+        return TasksPage.model_construct(
+            items=[
+                TaskSchema.model_construct(
                     id=task.id,
                     status=StatusEnum.READY,
                     pdf_url=task.pdf_url,
                     user_id=task.user_id,
                 )
                 for task in tasks
-            ]
+            ],
+            next_cursor=next_cursor,
+        )
 
     async def delete_task(
         self, task_id: UUID, user_id: UUID, is_superuser: bool = False
@@ -135,3 +419,6 @@ class TasksService:
 
             await self.sqla_repository.delete(uow.session, task_id)
             await uow.commit()
+        # Task may be copied back to Redis by get_task
+        await self.tasks_redis_cli.delete_task(task_id)
+        await self.invalidate_user_tasks(task.user_id)
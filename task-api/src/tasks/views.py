@@ -1,11 +1,21 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends, status, Request
+from fastapi import APIRouter, Depends, Query, Response, status, Request
+from fastapi.responses import StreamingResponse
 from shared import TaskSchema
-from src.core.limiter import limiter
+from src.core.limiter import hit_limit, rate_limit
 from src.auth.schemas import UserDTO
 from src.core.config import settings
 from src.core.dependencies import get_current_active_user, get_task_service
-from src.tasks.schemas import CreateTaskRequest, StylesResponse
+from src.core.exceptions import InvalidInputError
+from src.core.responses import PydanticJSONResponse
+from src.tasks.schemas import (
+    CreateTaskRequest,
+    CreateTasksBatchRequest,
+    StylesResponse,
+    TaskCreatedResponse,
+    TasksBatchResponse,
+    TasksStatusResponse,
+)
 from src.tasks.service import TasksService
 
 router = APIRouter()
@@ -13,11 +23,25 @@ router = APIRouter()
 
 @router.get("/", response_model=list[TaskSchema])
 async def get_tasks(
+    request: Request,
+    limit: int = Query(settings.tasks.page_size, ge=1, le=settings.tasks.max_page_size),
+    cursor: str | None = None,
     user: UserDTO = Depends(get_current_active_user),
     task_service: TasksService = Depends(get_task_service),
-) -> list[TaskSchema]:
-    """Get all user`s saved tasks"""
-    return await task_service.get_user_tasks(user_id=user.id)
+) -> PydanticJSONResponse:
+    """
+    Get user`s saved tasks, newest first. If there are more tasks, the
+    `X-Next-Cursor` header has the `cursor` of the next page and the `Link`
+    header has its URL
+    """
+    content, next_cursor = await task_service.get_user_tasks_json(
+        user_id=user.id, limit=limit, cursor=cursor
+    )
+    headers = {}
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        headers = {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+    return PydanticJSONResponse(content, headers=headers)
 
 
 @router.get("/styles", response_model=StylesResponse)
@@ -26,6 +50,17 @@ async def get_styles() -> StylesResponse:
     return StylesResponse(styles=settings.style.styles)
 
 
+@router.get("/status", response_model=TasksStatusResponse)
+async def get_tasks_status(
+    ids: list[UUID] = Query(min_length=1, max_length=settings.tasks.max_batch_size),
+    user: UserDTO = Depends(get_current_active_user),
+    task_service: TasksService = Depends(get_task_service),
+) -> PydanticJSONResponse:
+    """Get several tasks by ID, e.g. `?ids=...&ids=...`"""
+    tasks = await task_service.get_tasks_status(ids, user.id, user.is_superuser)
+    return PydanticJSONResponse(tasks)
+
+
 @router.get("/{task_id}", response_model=TaskSchema)
 async def get_task(
     task_id: UUID,
@@ -36,18 +71,109 @@ async def get_task(
     return await task_service.get_task(task_id, user.id, user.is_superuser)
 
 
-@router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
-@limiter.limit(settings.tasks.rate_limit)
+@router.get("/{task_id}/events")
+async def get_task_events(
+    task_id: UUID,
+    user: UserDTO = Depends(get_current_active_user),
+    task_service: TasksService = Depends(get_task_service),
+) -> StreamingResponse:
+    """Stream task status updates (Server-Sent Events)"""
+    task = await task_service.get_task(task_id, user.id, user.is_superuser)
+    return StreamingResponse(
+        task_service.iter_task_events(task),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{task_id}/wait", response_model=TaskSchema)
+async def wait_task(
+    task_id: UUID,
+    timeout: int = Query(
+        settings.tasks.long_poll_timeout, ge=1, le=settings.tasks.long_poll_timeout
+    ),
+    user: UserDTO = Depends(get_current_active_user),
+    task_service: TasksService = Depends(get_task_service),
+) -> TaskSchema:
+    """Wait for task status update (long-poll fallback for SSE)"""
+    task = await task_service.get_task(task_id, user.id, user.is_superuser)
+    return await task_service.wait_task_update(task, timeout)
+
+
+@router.post(
+    "/",
+    response_model=TaskCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[rate_limit(settings.tasks.rate_limit, scope="create_task")],
+)
 async def create_task(
-    request: Request,
     task: CreateTaskRequest,
     user: UserDTO = Depends(get_current_active_user),
     task_service: TasksService = Depends(get_task_service),
-) -> TaskSchema:
-    """Create new task"""
+) -> TaskCreatedResponse:
+    """Create new task. Returns 503 with Retry-After if the queue is backed up"""
     return await task_service.create_task(task.data, user.id)
 
 
+@router.post(
+    "/markdown",
+    response_model=TaskCreatedResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/markdown": {"schema": {"type": "string"}}},
+        }
+    },
+    dependencies=[rate_limit(settings.tasks.rate_limit, scope="create_task")],
+)
+async def create_task_from_markdown(
+    request: Request,
+    user: UserDTO = Depends(get_current_active_user),
+    task_service: TasksService = Depends(get_task_service),
+) -> TaskCreatedResponse:
+    """Create new task from raw markdown body (`Content-Type: text/markdown`)"""
+    # Body size is already limited by BodySizeLimitMiddleware
+    body = await request.body()
+    try:
+        data = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise InvalidInputError("Body must be UTF-8 encoded text")
+    return await task_service.create_task(data, user.id)
+
+
+@router.post(
+    "/batch",
+    response_model=TasksBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_207_MULTI_STATUS: {"model": TasksBatchResponse}},
+)
+async def create_tasks(
+    request: Request,
+    response: Response,
+    batch: CreateTasksBatchRequest,
+    user: UserDTO = Depends(get_current_active_user),
+    task_service: TasksService = Depends(get_task_service),
+) -> TasksBatchResponse:
+    """
+    Create several tasks at once. Every item counts against the batch rate
+    limit. Returns 207 if some items failed, they come with an error
+    """
+    await hit_limit(
+        request,
+        response,
+        settings.tasks.batch_rate_limit,
+        "create_tasks",
+        cost=len(batch.items),
+    )
+    items, eta = await task_service.create_tasks(
+        [item.data for item in batch.items], user.id
+    )
+    if any(item.error for item in items):
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return TasksBatchResponse(items=items, eta=eta)
+
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_task(
     task_id: UUID,
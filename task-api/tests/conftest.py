@@ -0,0 +1,48 @@
+import os
+import tempfile
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def _write_jwt_keys() -> tuple[Path, Path]:
+    """Key pair for src.auth.utils, which loads the keys on import"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    certs = Path(tempfile.mkdtemp(prefix="certs-"))
+    private_path, public_path = certs / "private.pem", certs / "public.pem"
+    private_path.write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    public_path.write_bytes(
+        key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+    return private_path, public_path
+
+
+# Settings are read from the environment when src modules are imported
+os.environ.setdefault("DB__USER", "user")
+os.environ.setdefault("DB__PASSWORD", "password")
+os.environ.setdefault("DB__NAME", "tasks")
+os.environ.setdefault("DB__HOST", "localhost")
+os.environ.setdefault("DB__PORT", "5432")
+os.environ.setdefault("EMAIL__SMTP_USER", "user")
+os.environ.setdefault("EMAIL__SMTP_PASSWORD", "password")
+os.environ.setdefault("RMQ__CONSUMER_QUEUE", "api")
+os.environ.setdefault("RMQ__PRODUCER_QUEUE", "llm")
+os.environ.setdefault("RMQ__DLX", "dlx")
+os.environ.setdefault("REDIS__HOST", "localhost")
+if "AUTH__PRIVATE_KEY_PATH" not in os.environ:
+    private_path, public_path = _write_jwt_keys()
+    os.environ["AUTH__PRIVATE_KEY_PATH"] = str(private_path)
+    os.environ["AUTH__PUBLIC_KEY_PATH"] = str(public_path)
+
+# src.auth and src.tasks import each other, load them in the order of the app
+import src.routers  # noqa: E402, F401
@@ -0,0 +1,96 @@
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from src.auth.schemas import UserDTO
+from src.core import limiter as limiter_module
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+from src.core.limiter import RateLimiter, hit_limit
+from src.tasks.schemas import CreateTaskRequest, CreateTasksBatchRequest
+from src.tasks.views import create_tasks
+
+
+@pytest.fixture(autouse=True)
+def memory_limiter(monkeypatch):
+    """Default limits counted in memory instead of Redis"""
+    limiter = RateLimiter(
+        storage_uri="memory://",
+        strategy=settings.rate_limit.strategy,
+        key_prefix=settings.rate_limit.key_prefix,
+    )
+    monkeypatch.setattr(limiter_module, "limiter", limiter)
+    return limiter
+
+
+@pytest.fixture
+def user():
+    return UserDTO(
+        id=uuid4(),
+        email="user@example.com",
+        is_deleted=False,
+        is_verified=True,
+        is_superuser=False,
+    )
+
+
+def make_request() -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/tasks/batch",
+            "headers": [],
+            "client": ("10.0.0.1", 1234),
+        }
+    )
+
+
+def make_batch(size: int) -> CreateTasksBatchRequest:
+    return CreateTasksBatchRequest(
+        items=[CreateTaskRequest(data=f"task {i}") for i in range(size)]
+    )
+
+
+@pytest.mark.asyncio
+async def test_batch_larger_than_single_create_limit_succeeds(user):
+    task_service = Mock()
+    task_service.create_tasks = AsyncMock(return_value=([], None))
+    batch = make_batch(10)
+    response = Response()
+
+    await create_tasks(make_request(), response, batch, user, task_service)
+
+    task_service.create_tasks.assert_awaited_once()
+    assert response.headers["X-RateLimit-Remaining"] == "90"
+
+
+@pytest.mark.asyncio
+async def test_batch_items_count_against_batch_limit(user):
+    task_service = Mock()
+    task_service.create_tasks = AsyncMock(return_value=([], None))
+    batch = make_batch(settings.tasks.max_batch_size)
+
+    await create_tasks(make_request(), Response(), batch, user, task_service)
+    with pytest.raises(TooManyRequestsError):
+        await create_tasks(
+            make_request(), Response(), make_batch(1), user, task_service
+        )
+
+    task_service.create_tasks.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_batch_does_not_consume_single_create_limit(user):
+    task_service = Mock()
+    task_service.create_tasks = AsyncMock(return_value=([], None))
+
+    await create_tasks(make_request(), Response(), make_batch(5), user, task_service)
+
+    # POST /tasks still has its whole budget
+    await hit_limit(
+        make_request(), Response(), settings.tasks.rate_limit, "create_task"
+    )